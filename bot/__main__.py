@@ -28,6 +28,23 @@ async def main():
         await close()
 
 
+async def benchmark():
+    match Config.benchmark:
+        case 'download':
+            from bot.youtube.benchmark import run_download_benchmark
+            await init()
+            try:
+                await run_download_benchmark()
+            finally:
+                await close()
+        case 'db':
+            from bot.db.benchmark import run_db_benchmark
+            await run_db_benchmark()
+        case _:
+            logging.error(f"Unknown benchmark: {Config.benchmark}")
+
 if __name__ == '__main__':
-    if Config.tg_token != 'None':
+    if Config.benchmark:
+        asyncio.run(benchmark())
+    elif Config.tg_token != 'None':
         asyncio.run(main())
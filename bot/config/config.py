@@ -6,8 +6,52 @@ class Config:
     tg_hash: str = 'b6b154c3707471f5339bd661645ed3d6'
     tg_token: str = 'None'
     db_path: str = 'data.db'
+    db_journal_mode: str = 'WAL'
+    db_synchronous: str = 'NORMAL'
+    db_mmap_size: int = 134217728
+    db_cache_size: int = -16384
+    db_busy_timeout: int = 5000
     http_proxy: str = ''
     cookie_path: str = ''
+    info_cache_size: int = 128
+    info_cache_ttl: int = 1800
+    info_db_budget: int = 64
+    cache_max_rows: int = 100000
+    cache_max_age: int = 15552000
+    cache_policy: str = 'lru'
+    quality_max_rows: int = 200000
+    quality_ttl: int = 604800
+    cache_gc_interval: int = 3600
+    extract_workers: int = 4
+    download_workers: int = 8
+    download_mode: str = 'thread'
+    postprocess_workers: int = 2
+    max_downloads: int = 10
+    stats_interval: int = 300
+    thumb_cache_size: int = 16
+    edit_budget: int = 20
+    rate_global: float = 25.0
+    rate_edit: float = 15.0
+    rate_upload: float = 2.0
+    rate_chat: float = 1.0
+    rate_chat_burst: int = 3
+    work_dir: str = 'downloads'
+    work_max_age: int = 86400
+    work_budget: int = 10240
+    work_gc_interval: int = 3600
+    job_poll_interval: int = 30
+    concurrent_fragments: int = 1
+    http_chunk_size: int = 0
+    buffer_size: int = 0
+    external_downloader: str = ''
+    external_downloader_args: str = ''
+    benchmark: str = ''
+    benchmark_url: str = ''
+    benchmark_quality: int = 720
+    benchmark_fragments: list = ['1', '4', '8', '16']
+    benchmark_chunk_sizes: list = ['0', '10485760']
+    benchmark_db_ops: int = 2000
+    benchmark_db_tasks: int = 16
     
     @classmethod
     def load_from_env(cls):
@@ -0,0 +1,104 @@
+import asyncio, threading, multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+
+class Pool:
+    def __init__(self, name: str, workers: int, process: bool = False):
+        self.name = name
+        self.workers = workers
+        self.process = process
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        if process:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+
+    def _call(self, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self.process:
+            return await self._run_process(func, *args)
+        with self._lock:
+            self.queued += 1
+        logging.debug(f"Submit to {self.name} pool: {self.stats()}")
+        future = self._executor.submit(self._call, func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    async def _run_process(self, func: Callable[..., Any], *args) -> Any:
+        # Worker processes can't report back when a job starts, so the
+        # queued/active split is derived from the number of jobs in flight.
+        with self._lock:
+            self.active += 1
+        logging.debug(f"Submit to {self.name} pool: {self.stats()}")
+        future = self._executor.submit(func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self.active -= 1
+                if not future.cancelled():
+                    self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            queued, active = self.queued, self.active
+            if self.process:
+                queued, active = max(0, active - self.workers), min(active, self.workers)
+            return {
+                "workers": self.workers,
+                "queued": queued,
+                "active": active,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+pools = {
+    "extract": Pool("extract", Config.extract_workers),
+    "download": Pool("download", Config.download_workers, process=Config.download_mode == "process"),
+    "postprocess": Pool("postprocess", Config.postprocess_workers),
+}
+
+
+async def run_in_pool(name: str, func: Callable[..., Any], *args) -> Any:
+    return await pools[name].run(func, *args)
+
+
+def pools_stats() -> Dict[str, Dict[str, int]]:
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+def shutdown_pools():
+    for pool in pools.values():
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -2,6 +2,7 @@ import yt_dlp, httpx, asyncio
 from collections import defaultdict
 from typing import cast
 from pyrogram.errors import FloodWait
+from bot.core.ratelimit import limiter, call_kind, call_chat_id
 
 class Common:
     select_video = {}
@@ -12,12 +13,24 @@ class Common:
 
 
 async def safe_call(func, *args, **kwargs):
-    for _ in range(5):
+    kind = call_kind(func)
+    chat_id = call_chat_id(func, kwargs)
+    attempts = 5
+    for attempt in range(attempts):
+        if kind is not None:
+            await limiter.acquire(kind, chat_id)
         try:
-            return await func(*args, **kwargs)
+            result = await func(*args, **kwargs)
         except FloodWait as e:
+            if attempt == attempts - 1:
+                raise
             wait_sec: int = cast(int, e.value)
-            await asyncio.sleep(wait_sec + 1)
-    raise
-
-
+            if kind is None:
+                await asyncio.sleep(wait_sec + 1)
+            else:
+                # The limiter holds back this call and its neighbours until the wait is over.
+                limiter.flood_wait(kind, chat_id, wait_sec + 1)
+            continue
+        if kind is not None:
+            limiter.success(kind, chat_id)
+        return result
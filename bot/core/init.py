@@ -1,5 +1,9 @@
 from bot.core.handlers import init_handlers
 from bot.funcs.watchdog import watchdog_startup
+from bot.funcs.job_queue import start_job_queue
+from bot.funcs.cache_gc import start_cache_gc
+from bot.funcs.stats import start_stats
+from bot.core.executors import shutdown_pools
 from pyrogram.client import Client
 from bot.config.config import Config
 from bot.config import logging_config
@@ -18,6 +22,9 @@ init_handlers(app)
 async def start_bot():
     logging.info("Launching the bot...")
     await app.start()
+    await start_job_queue(app)
+    start_cache_gc()
+    start_stats()
     await watchdog_startup(app)
     logging.info("Bot have been started!")
 
@@ -25,6 +32,7 @@ async def start_bot():
 async def stop_bot():
     logging.info("Stopping the bot...")
     await app.stop()
+    shutdown_pools()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import asyncio, time
+from typing import Dict, List, Optional, Tuple
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+SEND = 'send'
+EDIT = 'edit'
+UPLOAD = 'upload'
+
+EDIT_METHODS = {
+    'edit_text', 'edit_caption', 'edit_reply_markup',
+    'edit_message_text', 'edit_message_caption', 'edit_message_reply_markup',
+}
+UPLOAD_METHODS = {
+    'reply_video', 'reply_audio', 'reply_photo', 'reply_document',
+    'send_video', 'send_audio', 'send_photo', 'send_document',
+}
+# Reads and callback answers don't count towards the message limits.
+UNLIMITED_METHODS = {'answer', 'answer_callback_query', 'get_messages', 'download_media'}
+
+_MAX_CHATS = 1024
+_MIN_RATE = 0.05
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        # A zero or negative rate from the config would never refill the bucket.
+        rate = max(_MIN_RATE, rate)
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst and now >= self.blocked_until and self.rate == self.base_rate
+
+    def penalize(self, wait: float):
+        # Multiplicative decrease on FloodWait, additive increase on success.
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + wait)
+        self.tokens = 0
+        self.updated = now
+        self.rate = max(self.base_rate / 10, self.rate / 2)
+
+    def reward(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 20)
+
+
+class RateLimiter:
+    def __init__(self, global_rate: float, edit_rate: float, upload_rate: float, chat_rate: float, chat_burst: int):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.waited = 0.0
+        self.flood_waits = 0
+        self._global = TokenBucket(global_rate, global_rate)
+        self._classes = {
+            EDIT: TokenBucket(edit_rate, edit_rate),
+            UPLOAD: TokenBucket(upload_rate, max(1.0, upload_rate)),
+        }
+        self._chats: Dict[Tuple[int, str], TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int, kind: str) -> TokenBucket:
+        # Uploads get their own per-chat bucket so queued edits don't delay them.
+        key = (chat_id, UPLOAD if kind == UPLOAD else SEND)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            if len(self._chats) >= _MAX_CHATS:
+                self._prune()
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[key] = bucket
+        return bucket
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, b in self._chats.items() if b.idle(now)]:
+            del self._chats[key]
+
+    def _buckets(self, kind: str, chat_id: Optional[int]) -> List[TokenBucket]:
+        buckets = [self._global]
+        if kind in self._classes:
+            buckets.append(self._classes[kind])
+        if chat_id is not None:
+            buckets.append(self._chat_bucket(chat_id, kind))
+        return buckets
+
+    async def acquire(self, kind: str, chat_id: Optional[int] = None):
+        buckets = self._buckets(kind, chat_id)
+        while True:
+            now = time.monotonic()
+            delay = max(bucket.delay(now) for bucket in buckets)
+            if delay <= 0:
+                for bucket in buckets:
+                    bucket.take()
+                return
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def flood_wait(self, kind: str, chat_id: Optional[int], wait: float):
+        self.flood_waits += 1
+        if chat_id is not None:
+            bucket = self._chat_bucket(chat_id, kind)
+        else:
+            bucket = self._classes.get(kind, self._global)
+        bucket.penalize(wait)
+        logging.warning(f"FloodWait {wait}s for {kind} (chat {chat_id}), rate lowered to {bucket.rate:.2f}/s")
+
+    def success(self, kind: str, chat_id: Optional[int]):
+        self._global.reward()
+        if kind in self._classes:
+            self._classes[kind].reward()
+        if chat_id is not None:
+            self._chat_bucket(chat_id, kind).reward()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "chats": len(self._chats),
+            "flood_waits": self.flood_waits,
+            "waited": round(self.waited, 1),
+        }
+
+
+def call_kind(func) -> Optional[str]:
+    name = getattr(func, '__name__', '')
+    if name in UNLIMITED_METHODS:
+        return None
+    if name in EDIT_METHODS:
+        return EDIT
+    if name in UPLOAD_METHODS:
+        return UPLOAD
+    return SEND
+
+
+def call_chat_id(func, kwargs) -> Optional[int]:
+    chat_id = kwargs.get('chat_id')
+    if isinstance(chat_id, int):
+        return chat_id
+    chat = getattr(getattr(func, '__self__', None), 'chat', None)
+    return getattr(chat, 'id', None)
+
+
+limiter = RateLimiter(
+    Config.rate_global,
+    Config.rate_edit,
+    Config.rate_upload,
+    Config.rate_chat,
+    Config.rate_chat_burst
+)
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
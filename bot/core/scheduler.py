@@ -0,0 +1,132 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+from bot.core.ticker import ticker, Animation
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+INTERACTIVE = 0
+WATCHDOG = 1
+POSITION_INTERVAL = 2.0
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, on_position: Optional[PositionCallback]):
+        self.future = future
+        self.on_position = on_position
+        self.position = 0
+        self._animation: Optional[Animation] = None
+
+    # Position edits go through the shared ticker: one pending edit per waiter,
+    # only the latest position is sent, and the edit budget applies.
+    def start(self):
+        if self.on_position is not None:
+            self._animation = ticker.add(self.render, self.edit, POSITION_INTERVAL)
+
+    def stop(self):
+        if self._animation is not None:
+            ticker.remove(self._animation)
+            self._animation = None
+
+    def render(self) -> Optional[str]:
+        if not self.position:
+            return None
+        return str(self.position)
+
+    async def edit(self, text: str):
+        await self.on_position(int(text))
+
+
+class Scheduler:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._queues: Dict[int, OrderedDict[int, Deque[_Waiter]]] = {
+            INTERACTIVE: OrderedDict(),
+            WATCHDOG: OrderedDict(),
+        }
+
+    def waiting(self) -> int:
+        return sum(len(q) for users in self._queues.values() for q in users.values())
+
+    async def acquire(self, user_id: int, priority: int = INTERACTIVE, on_position: Optional[PositionCallback] = None):
+        if self.active < self.limit and not self.waiting():
+            self.active += 1
+            return
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), on_position)
+        self._queues[priority].setdefault(user_id, deque()).append(waiter)
+        logging.debug(f"{user_id}: Queued download, active={self.active} waiting={self.waiting()}")
+        self._notify_positions()
+        waiter.start()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            else:
+                self._remove(priority, user_id, waiter)
+                self._notify_positions()
+            raise
+        finally:
+            waiter.stop()
+
+    def release(self):
+        self.active -= 1
+        while self.active < self.limit:
+            waiter = self._pop_next()
+            if waiter is None:
+                break
+            if waiter.future.done():
+                continue
+            self.active += 1
+            waiter.stop()
+            waiter.future.set_result(None)
+        self._notify_positions()
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if not users:
+                continue
+            user_id, queue = next(iter(users.items()))
+            waiter = queue.popleft()
+            # Round-robin: the user goes to the back of the line for their next download.
+            del users[user_id]
+            if queue:
+                users[user_id] = queue
+            return waiter
+        return None
+
+    def _remove(self, priority: int, user_id: int, waiter: _Waiter):
+        queue = self._queues[priority].get(user_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del self._queues[priority][user_id]
+
+    def _service_order(self) -> Iterator[_Waiter]:
+        for priority in sorted(self._queues):
+            queues: List[Deque[_Waiter]] = [deque(q) for q in self._queues[priority].values()]
+            while queues:
+                for queue in queues:
+                    yield queue.popleft()
+                queues = [q for q in queues if q]
+
+    def _notify_positions(self):
+        for position, waiter in enumerate(self._service_order(), 1):
+            waiter.position = position
+
+
+scheduler = Scheduler(Config.max_downloads)
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def wait(self, key: Hashable) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            return None
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                return None
+            raise
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        while key in self._calls:
+            future = self._calls[key]
+            try:
+                return await asyncio.shield(future), False
+            except asyncio.CancelledError:
+                # Leader was cancelled: retry, possibly taking over as the new leader.
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved so a leader failure without followers stays quiet.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            self._calls.pop(key, None)
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,24 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = self.stages.get(name, 0.0) + time.monotonic() - start
+            self.stages[name] = round(elapsed, 3)
+
+    def total(self) -> float:
+        return round(sum(self.stages.values()), 3)
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
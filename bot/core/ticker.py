@@ -0,0 +1,111 @@
+import asyncio, time
+from typing import Awaitable, Callable, Dict, Optional, Set
+from pyrogram.errors import MessageEditTimeExpired, MessageIdInvalid, MessageNotModified
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+Render = Callable[[], Optional[str]]
+Edit = Callable[[str], Awaitable[None]]
+
+# Editing a deleted message raises MessageIdInvalid.
+UNRECOVERABLE = (MessageIdInvalid, MessageEditTimeExpired)
+
+
+class Animation:
+    def __init__(self, render: Render, edit: Edit, interval: float):
+        self.render = render
+        self.edit = edit
+        self.interval = interval
+        self.last_edit = 0.0
+        self.last_text: Optional[str] = None
+        self.pending: Optional[asyncio.Task] = None
+        self.stopped = asyncio.Event()
+
+
+class Ticker:
+    def __init__(self, budget: int, tick: float = 0.25):
+        self.budget = max(1, budget)
+        self.tick = tick
+        self.edits = 0
+        self.failed = 0
+        self._tokens = float(self.budget)
+        self._animations: Set[Animation] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, render: Render, edit: Edit, interval: float = 1.0) -> Animation:
+        animation = Animation(render, edit, interval)
+        self._animations.add(animation)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return animation
+
+    def remove(self, animation: Animation):
+        self._animations.discard(animation)
+        if animation.pending is not None:
+            animation.pending.cancel()
+            animation.pending = None
+        animation.stopped.set()
+
+    def frame_interval(self, animation: Animation) -> float:
+        # Under load every animation slows down so the total stays within the budget.
+        return max(animation.interval, len(self._animations) / self.budget)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "animations": len(self._animations),
+            "edits": self.edits,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        last = time.monotonic()
+        while self._animations:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            self._tokens = min(self.budget, self._tokens + (now - last) * self.budget)
+            last = now
+
+            due = [
+                a for a in self._animations
+                if a.pending is None and now - a.last_edit >= self.frame_interval(a)
+            ]
+            for animation in sorted(due, key=lambda a: a.last_edit):
+                if self._tokens < 1:
+                    break
+                text = animation.render()
+                if text is None or text == animation.last_text:
+                    continue
+                self._tokens -= 1
+                animation.last_edit = now
+                animation.last_text = text
+                animation.pending = asyncio.create_task(self._edit(animation, text))
+
+    async def _edit(self, animation: Animation, text: str):
+        try:
+            await animation.edit(text)
+            self.edits += 1
+        except asyncio.CancelledError:
+            raise
+        except MessageNotModified:
+            # The message already shows this text, so the frame is on screen.
+            self.edits += 1
+        except UNRECOVERABLE as e:
+            logging.warning(f"Animation stopped: {e}")
+            self.failed += 1
+            self.remove(animation)
+        except Exception as e:
+            logging.warning(f"Animation edit failed: {e}")
+            self.failed += 1
+            # Resend the frame on the next tick even if the text did not change.
+            animation.last_text = None
+        finally:
+            if animation.pending is asyncio.current_task():
+                animation.pending = None
+
+
+ticker = Ticker(Config.edit_budget)
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,71 @@
+import os, shutil, time
+from pathlib import Path
+from typing import Set, Tuple
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+
+def workdir_path(video_id: str, quality: int) -> str:
+    return str(Path(Config.work_dir) / f"{video_id}_{quality}")
+
+
+def job_workdir(video_id: str, quality: int) -> str:
+    path = Path(workdir_path(video_id, quality))
+    path.mkdir(parents=True, exist_ok=True)
+    return str(path)
+
+
+def remove_workdir(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _dir_usage(path: Path) -> Tuple[int, float]:
+    size = 0
+    mtime = path.stat().st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            size += stat.st_size
+            mtime = max(mtime, stat.st_mtime)
+    return size, mtime
+
+
+def gc_workdirs(active: Set[str]) -> int:
+    root = Path(Config.work_dir)
+    if not root.is_dir():
+        return 0
+
+    now = time.time()
+    removed = 0
+    kept = []
+    total = 0
+    for child in root.iterdir():
+        if not child.is_dir():
+            continue
+        size, mtime = _dir_usage(child)
+        if now - mtime > Config.work_max_age:
+            logging.debug(f"Remove abandoned work dir {child}")
+            remove_workdir(str(child))
+            removed += 1
+            continue
+        total += size
+        if str(child) not in active:
+            kept.append((mtime, size, child))
+
+    budget = Config.work_budget * 1024 * 1024
+    for _, size, child in sorted(kept, key=lambda k: k[0]):
+        if total <= budget:
+            break
+        logging.debug(f"Remove work dir {child} to fit the disk budget")
+        remove_workdir(str(child))
+        total -= size
+        removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
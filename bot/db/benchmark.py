@@ -0,0 +1,67 @@
+import asyncio, os, random, tempfile, time
+from typing import Any, Dict
+from tortoise import Tortoise
+from bot.db.db import db_config, db_pragmas
+from bot.db.cache_qualitys import set_qualitys, get_qualitys
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+# SQLite defaults, with the rollback journal Tortoise would otherwise replace by WAL.
+BASELINE = {"journal_mode": "DELETE", "synchronous": "FULL"}
+_VIDEOS = 500
+_WRITE_RATIO = 0.2
+
+
+def _video(i: int) -> str:
+    return f"bench{i:06d}"
+
+
+async def _worker(ops: int, counts: Dict[str, int]):
+    for _ in range(ops):
+        vid = _video(random.randrange(_VIDEOS))
+        if random.random() < _WRITE_RATIO:
+            await set_qualitys(vid, {720: random.random() * 100, 1080: random.random() * 200})
+            counts["writes"] += 1
+        else:
+            await get_qualitys(vid)
+            counts["reads"] += 1
+
+
+async def _run_profile(name: str, pragmas: Dict[str, Any]) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        await Tortoise.init(config=db_config(os.path.join(tmpdirname, "bench.db"), pragmas))
+        try:
+            await Tortoise.generate_schemas()
+            for i in range(_VIDEOS):
+                await set_qualitys(_video(i), {360: 1.0, 720: 2.0})
+
+            tasks = max(1, Config.benchmark_db_tasks)
+            counts = {"reads": 0, "writes": 0}
+            start = time.monotonic()
+            await asyncio.gather(*[_worker(Config.benchmark_db_ops // tasks, counts) for _ in range(tasks)])
+            elapsed = time.monotonic() - start
+        finally:
+            await Tortoise.close_connections()
+
+    result = {
+        "reads_per_sec": counts["reads"] / elapsed,
+        "writes_per_sec": counts["writes"] / elapsed,
+        "ops_per_sec": (counts["reads"] + counts["writes"]) / elapsed,
+    }
+    logging.info(
+        f"{name}: {result['ops_per_sec']:.0f} ops/s "
+        f"({result['reads_per_sec']:.0f} reads/s, {result['writes_per_sec']:.0f} writes/s) "
+        f"with {pragmas}"
+    )
+    return result
+
+
+async def run_db_benchmark():
+    baseline = await _run_profile("baseline", BASELINE)
+    profile = await _run_profile("profile", db_pragmas())
+    logging.info(f"Profile speedup: {profile['ops_per_sec'] / baseline['ops_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
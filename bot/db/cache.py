@@ -1,22 +1,71 @@
+import time
+from tortoise.expressions import F
 from bot.db.models import Cache
-from typing import Tuple
+from bot.db.eviction import evict_rows
+from bot.youtube.url import video_id
+from typing import Any, Collection, Dict, Optional, Set, Tuple
 
+LRU = 'lru'
+LFU = 'lfu'
 
-async def get_cache(url: str, quality: int) -> Tuple[int, int]:
-    cache_entry = await Cache.filter(url=url, quality=quality).first()
-    if cache_entry:
-        return cache_entry.chat_id, cache_entry.message_id
-    return 0, 0
 
+def _media_fields(media_msg, caption: str) -> Dict[str, Any]:
+    media = media_msg.video or media_msg.audio
+    if media is None:
+        return {}
+    return {
+        "file_id": media.file_id,
+        "file_unique_id": media.file_unique_id,
+        "media_type": "video" if media_msg.video else "audio",
+        "duration": media.duration or 0,
+        "thumb_file_id": media.thumbs[0].file_id if media.thumbs else "",
+        "caption": caption or "",
+    }
 
-async def set_cache(url: str, quality: int, chat_id: int, message_id: int):
-    cache_entry = await Cache.filter(url=url, quality=quality).first()
-    if cache_entry:
-        cache_entry.chat_id = chat_id
-        cache_entry.message_id = message_id
-        await cache_entry.save()
-    else:
-        await Cache.create(url=url, quality=quality, chat_id=chat_id, message_id=message_id)
+
+async def get_cache(url: str, quality: int) -> Optional[Cache]:
+    entry = await Cache.filter(video_id=video_id(url), quality=quality).first()
+    if entry:
+        await Cache.filter(id=entry.id).update(hits=F("hits") + 1, last_access=int(time.time()))
+    return entry
+
+
+async def get_cached_qualitys(url: str) -> Set[int]:
+    records = await Cache.filter(video_id=video_id(url)).values_list("quality", flat=True)
+    return set(records)
+
+
+async def get_cached_keys(video_ids: Collection[str]) -> Set[Tuple[str, int]]:
+    records = await Cache.filter(video_id__in=list(video_ids)).values_list("video_id", "quality")
+    return set(records)
+
+
+async def set_cache(url: str, quality: int, media_msg, caption: str):
+    await Cache.update_or_create(
+        video_id=video_id(url),
+        quality=quality,
+        defaults={
+            "chat_id": media_msg.chat.id,
+            "message_id": media_msg.id,
+            "last_access": int(time.time()),
+            **_media_fields(media_msg, caption),
+        }
+    )
+
+
+async def set_cache_media(url: str, quality: int, media_msg, caption: str):
+    fields = _media_fields(media_msg, caption)
+    if fields:
+        await Cache.filter(video_id=video_id(url), quality=quality).update(**fields)
+
+
+async def del_cache(url: str, quality: int):
+    await Cache.filter(video_id=video_id(url), quality=quality).delete()
+
+
+async def evict_cache(max_rows: int, max_age: int, policy: str = LRU) -> int:
+    order = ("hits", "last_access") if policy == LFU else ("last_access",)
+    return await evict_rows(Cache, max_rows, max_age, order)
 
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
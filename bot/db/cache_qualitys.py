@@ -1,31 +1,57 @@
+import time
 from typing import Dict
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
 from .models import CacheQuality
+from bot.db.eviction import evict_rows
+from bot.youtube.url import video_id
+from bot.config.config import Config
 
 
 async def set_quality_size(url: str, quality: int, size: float):
-    obj, created = await CacheQuality.get_or_create(
-        url=url,
-        resolution=quality,
-        defaults={"size": size}
+    await _upsert_qualitys(video_id(url), {quality: size})
+
+
+async def _upsert_qualitys(vid: str, qualitys: Dict[int, float]):
+    now = int(time.time())
+    await CacheQuality.bulk_create(
+        [
+            CacheQuality(video_id=vid, resolution=resolution, size=size, last_access=now, updated_at=now)
+            for resolution, size in qualitys.items()
+        ],
+        # on_conflict takes column names; video_id is stored in the url column.
+        on_conflict=["url", "resolution"],
+        update_fields=["size", "last_access", "updated_at"]
     )
-    if not created:
-        obj.size = size
-        await obj.save()
 
 
 async def set_qualitys(url: str, qualitys: Dict[int, float]):
-    for resolution, size in qualitys.items():
-        await set_quality_size(url, resolution, size)
+    # A full extraction replaces the stored set: resolutions it no longer
+    # lists would otherwise keep an old updated_at and expire the whole video.
+    vid = video_id(url)
+    async with in_transaction("default"):
+        await CacheQuality.filter(video_id=vid).exclude(resolution__in=list(qualitys)).delete()
+        if qualitys:
+            await _upsert_qualitys(vid, qualitys)
 
 
 async def get_qualitys(url: str) -> Dict[int, float]:
+    vid = video_id(url)
     records = (
         await CacheQuality
-        .filter(url=url)
+        .filter(video_id=vid)
         .order_by("resolution")
-        .values("resolution", "size")
+        .values("resolution", "size", "updated_at")
     )
-    
+    if not records:
+        return {}
+
+    now = int(time.time())
+    # YouTube re-encodes videos, so estimates past their TTL are rebuilt by the caller.
+    if Config.quality_ttl > 0 and min(r["updated_at"] for r in records) < now - Config.quality_ttl:
+        return {}
+    await CacheQuality.filter(video_id=vid).update(hits=F("hits") + 1, last_access=now)
+
     result = {}
     audio_record = None
     for record in records:
@@ -39,6 +65,10 @@ async def get_qualitys(url: str) -> Dict[int, float]:
 
     return result
 
+
+async def evict_qualitys(max_rows: int, max_age: int) -> int:
+    return await evict_rows(CacheQuality, max_rows, max_age, ("last_access",))
+
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
 
@@ -1,13 +1,42 @@
+from typing import Any, Dict
 from bot.config.config import Config
 from tortoise import Tortoise
+from bot.db.options import load_options
+from bot.db.migrations import run_migrations
+
+
+def db_pragmas() -> Dict[str, Any]:
+    return {
+        "journal_mode": Config.db_journal_mode,
+        "synchronous": Config.db_synchronous,
+        "mmap_size": Config.db_mmap_size,
+        "cache_size": Config.db_cache_size,
+        "busy_timeout": Config.db_busy_timeout,
+    }
+
+
+def db_config(path: str, pragmas: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "connections": {
+            "default": {
+                "engine": "tortoise.backends.sqlite",
+                "credentials": {"file_path": path, **pragmas},
+            }
+        },
+        "apps": {
+            "models": {
+                "models": ["bot.db.models"],
+                "default_connection": "default",
+            }
+        },
+    }
 
 
 async def init():
-    await Tortoise.init(
-        db_url=f"sqlite://{Config.db_path}",
-        modules={'models': ['bot.db.models']}
-    )
+    await Tortoise.init(config=db_config(Config.db_path, db_pragmas()))
     await Tortoise.generate_schemas()
+    await run_migrations()
+    await load_options()
 
 
 async def close():
@@ -0,0 +1,21 @@
+import time
+from typing import Tuple
+
+_CHUNK = 500
+
+
+async def evict_rows(model, max_rows: int, max_age: int, order: Tuple[str, ...]) -> int:
+    removed = 0
+    if max_age > 0:
+        removed += await model.filter(last_access__lt=int(time.time()) - max_age).delete()
+    if max_rows > 0:
+        excess = await model.all().count() - max_rows
+        if excess > 0:
+            ids = await model.all().order_by(*order).limit(excess).values_list("id", flat=True)
+            for start in range(0, len(ids), _CHUNK):
+                removed += await model.filter(id__in=ids[start:start + _CHUNK]).delete()
+    return removed
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,66 @@
+import json, time, zlib
+from typing import Any, Dict
+from tortoise.functions import Sum
+from bot.db.models import InfoJson
+from bot.config.config import Config
+
+
+async def get_info_json(video_id: str) -> Dict[str, Any]:
+    entry = await InfoJson.filter(video_id=video_id).first()
+    if not entry:
+        return {}
+    now = int(time.time())
+    if entry.expires_at <= now:
+        await entry.delete()
+        return {}
+    entry.last_access = now
+    await entry.save(update_fields=["last_access"])
+    return json.loads(zlib.decompress(entry.data))
+
+
+async def set_info_json(video_id: str, info: Dict[str, Any], expires_at: int):
+    data = zlib.compress(json.dumps(info, separators=(",", ":")).encode(), 6)
+    await InfoJson.update_or_create(
+        defaults={
+            "data": data,
+            "size": len(data),
+            "expires_at": expires_at,
+            "last_access": int(time.time()),
+        },
+        video_id=video_id
+    )
+
+
+async def prune_info_json() -> int:
+    removed = await InfoJson.filter(expires_at__lte=int(time.time())).delete()
+
+    budget = Config.info_db_budget * 1024 * 1024
+    total = (
+        await InfoJson
+        .all()
+        .annotate(total=Sum("size"))
+        .first()
+        .values_list("total", flat=True)
+    )
+    if not total or total <= budget:
+        return removed
+
+    records = (
+        await InfoJson
+        .all()
+        .order_by("-last_access")
+        .values_list("id", "size")
+    )
+    total = 0
+    stale_ids = []
+    for record_id, size in records:
+        total += size
+        if total > budget:
+            stale_ids.append(record_id)
+    if stale_ids:
+        removed += await InfoJson.filter(id__in=stale_ids).delete()
+    return removed
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,100 @@
+import json, time
+from typing import Collection, Dict, List, Optional, Set
+from bot.db.models import DownloadJob
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+async def enqueue_job(
+    video_id: str,
+    quality: int,
+    url: str,
+    duration: int,
+    priority: int,
+    chat_id: int,
+    message_id: int,
+    workdir: str
+) -> int:
+    now = int(time.time())
+    job = await DownloadJob.create(
+        video_id=video_id,
+        quality=quality,
+        url=url,
+        duration=duration or 0,
+        priority=priority,
+        chat_id=chat_id,
+        message_id=message_id,
+        workdir=workdir,
+        status=QUEUED,
+        created_at=now,
+        updated_at=now
+    )
+    return job.id
+
+
+async def _next_queued_job(busy_chats: Collection[int]) -> Optional[DownloadJob]:
+    queued = DownloadJob.filter(status=QUEUED).order_by("priority", "id")
+    if busy_chats:
+        # Round-robin: chats without a running job go first.
+        job = await queued.exclude(chat_id__in=list(busy_chats)).first()
+        if job is not None:
+            return job
+    return await queued.first()
+
+
+async def get_queued_jobs() -> List[DownloadJob]:
+    return await DownloadJob.filter(status=QUEUED).order_by("priority", "id")
+
+
+async def claim_job(job: DownloadJob) -> bool:
+    # Conditional update: only one claimer can move the job out of the queued state.
+    claimed = await DownloadJob.filter(id=job.id, status=QUEUED).update(
+        status=RUNNING,
+        updated_at=int(time.time())
+    )
+    if claimed:
+        job.status = RUNNING
+    return bool(claimed)
+
+
+async def claim_next_job(busy_chats: Collection[int] = ()) -> Optional[DownloadJob]:
+    while True:
+        job = await _next_queued_job(busy_chats)
+        if job is None:
+            return None
+        if await claim_job(job):
+            return job
+
+
+async def finish_job(job_id: int, status: str, stages: Dict[str, float]):
+    await DownloadJob.filter(id=job_id).update(
+        status=status,
+        stages=json.dumps(stages),
+        updated_at=int(time.time())
+    )
+
+
+async def requeue_running_jobs() -> int:
+    return await DownloadJob.filter(status=RUNNING).update(
+        status=QUEUED,
+        updated_at=int(time.time())
+    )
+
+
+async def get_active_workdirs() -> Set[str]:
+    records = await DownloadJob.filter(status__in=[QUEUED, RUNNING]).values_list("workdir", flat=True)
+    return set(records)
+
+
+async def prune_jobs(max_age: int):
+    await DownloadJob.filter(
+        status__in=[DONE, FAILED],
+        updated_at__lt=int(time.time()) - max_age
+    ).delete()
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
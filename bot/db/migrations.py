@@ -0,0 +1,146 @@
+import time
+from typing import Awaitable, Callable, List, Tuple
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+from bot.youtube.url import video_id
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+
+async def _rekey_by_video_id(table: str, variant_column: str) -> int:
+    # Raw SQL on purpose: the models gain columns in later migrations, so this
+    # must only touch the columns that exist at this point in the history.
+    conn = Tortoise.get_connection("default")
+    _, rows = await conn.execute_query(
+        f'SELECT "id", "url", "{variant_column}" FROM "{table}" ORDER BY "id" DESC'
+    )
+    groups = {}
+    for row in rows:
+        key = (video_id(row["url"]), row[variant_column])
+        groups.setdefault(key, []).append(row)
+
+    changed = 0
+    for (vid, _), group in groups.items():
+        keep, duplicates = group[0], group[1:]
+        for row in duplicates:
+            await conn.execute_query(f'DELETE FROM "{table}" WHERE "id" = ?', [row["id"]])
+            changed += 1
+        if keep["url"] != vid:
+            await conn.execute_query(f'UPDATE "{table}" SET "url" = ? WHERE "id" = ?', [vid, keep["id"]])
+            changed += 1
+    return changed
+
+
+async def migrate_video_id_keys():
+    cache_changed = await _rekey_by_video_id("cache", "quality")
+    quality_changed = await _rekey_by_video_id("cache_qualitys", "resolution")
+    if cache_changed or quality_changed:
+        logging.info(
+            f"Rekeyed cache rows by video id: cache={cache_changed}, cache_qualitys={quality_changed}"
+        )
+
+
+async def _add_column(table: str, column: str, definition: str) -> bool:
+    conn = Tortoise.get_connection("default")
+    _, rows = await conn.execute_query(f'PRAGMA table_info("{table}")')
+    if any(row["name"] == column for row in rows):
+        return False
+    await conn.execute_query(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}')
+    return True
+
+
+async def migrate_job_queue():
+    if await _add_column("download_jobs", "stages", "TEXT NOT NULL DEFAULT '{}'"):
+        logging.info("Added stage timings to download jobs")
+
+
+async def migrate_cache_media():
+    columns = (
+        ("file_id", "VARCHAR(255) NOT NULL DEFAULT ''"),
+        ("file_unique_id", "VARCHAR(255) NOT NULL DEFAULT ''"),
+        ("media_type", "VARCHAR(16) NOT NULL DEFAULT ''"),
+        ("duration", "INT NOT NULL DEFAULT 0"),
+        ("thumb_file_id", "VARCHAR(255) NOT NULL DEFAULT ''"),
+        ("caption", "TEXT NOT NULL DEFAULT ''"),
+    )
+    added = [name for name, definition in columns if await _add_column("cache", name, definition)]
+    if added:
+        logging.info(f"Added Telegram media columns to cache: {', '.join(added)}")
+
+
+def _index_sql(name: str, table: str, columns: Tuple[str, ...]) -> str:
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    return f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_list})'
+
+
+INDEXES = (
+    ("idx_options_name_value", "options", ("option_name", "value")),
+    ("idx_download_jobs_status_priority", "download_jobs", ("status", "priority", "id")),
+    ("idx_download_jobs_status_updated", "download_jobs", ("status", "updated_at")),
+    ("idx_info_json_expires_at", "info_json", ("expires_at",)),
+    ("idx_info_json_last_access", "info_json", ("last_access",)),
+)
+
+
+async def create_indexes():
+    conn = Tortoise.get_connection("default")
+    for index in INDEXES:
+        await conn.execute_query(_index_sql(*index))
+
+
+EVICTION_INDEXES = (
+    ("idx_cache_last_access", "cache", ("last_access",)),
+    ("idx_cache_hits_last_access", "cache", ("hits", "last_access")),
+    ("idx_cache_qualitys_last_access", "cache_qualitys", ("last_access",)),
+)
+
+
+async def migrate_cache_eviction():
+    columns = (
+        ("cache", "hits", "INT NOT NULL DEFAULT 0"),
+        ("cache", "last_access", "BIGINT NOT NULL DEFAULT 0"),
+        ("cache_qualitys", "hits", "INT NOT NULL DEFAULT 0"),
+        ("cache_qualitys", "last_access", "BIGINT NOT NULL DEFAULT 0"),
+        ("cache_qualitys", "updated_at", "BIGINT NOT NULL DEFAULT 0"),
+    )
+    for table, name, definition in columns:
+        await _add_column(table, name, definition)
+    # Existing rows start their eviction clock now; their size estimates are
+    # left with updated_at = 0 so they are refreshed on the next lookup.
+    now = int(time.time())
+    conn = Tortoise.get_connection("default")
+    for table in ("cache", "cache_qualitys"):
+        await conn.execute_query(f'UPDATE "{table}" SET "last_access" = ? WHERE "last_access" = 0', [now])
+    for index in EVICTION_INDEXES:
+        await conn.execute_query(_index_sql(*index))
+
+
+# Migrations are applied in order and recorded in PRAGMA user_version.
+# Never renumber an entry; append new ones at the end.
+MIGRATIONS: List[Tuple[int, str, Callable[[], Awaitable[None]]]] = [
+    (1, "telegram media columns on cache", migrate_cache_media),
+    (2, "persistent download job queue", migrate_job_queue),
+    (3, "cache keyed by video id", migrate_video_id_keys),
+    (4, "secondary indexes", create_indexes),
+    (5, "cache hit counts and eviction indexes", migrate_cache_eviction),
+]
+
+
+async def _user_version() -> int:
+    _, rows = await Tortoise.get_connection("default").execute_query("PRAGMA user_version")
+    return rows[0][0]
+
+
+async def run_migrations():
+    version = await _user_version()
+    for number, name, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        logging.info(f"Applying migration {number}: {name}")
+        async with in_transaction("default") as conn:
+            await migration()
+            await conn.execute_query(f"PRAGMA user_version = {number}")
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -4,25 +4,36 @@ from tortoise import fields
 
 class Cache(tortoise.models.Model):
     id = fields.IntField(pk=True)
-    url = fields.CharField(max_length=255)
+    video_id = fields.CharField(max_length=255, source_field="url")
     quality = fields.BigIntField()
     chat_id = fields.BigIntField()
     message_id = fields.BigIntField()
+    file_id = fields.CharField(max_length=255, default="")
+    file_unique_id = fields.CharField(max_length=255, default="")
+    media_type = fields.CharField(max_length=16, default="")
+    duration = fields.IntField(default=0)
+    thumb_file_id = fields.CharField(max_length=255, default="")
+    caption = fields.TextField(default="")
+    hits = fields.IntField(default=0)
+    last_access = fields.BigIntField(default=0)
 
     class Meta(tortoise.models.Model.Meta):
         table = "cache"
-        unique_together = ("url", "quality")
+        unique_together = ("video_id", "quality")
 
 
 class CacheQuality(tortoise.models.Model):
     id = fields.IntField(pk=True)
-    url = fields.CharField(max_length=255)
+    video_id = fields.CharField(max_length=255, source_field="url")
     resolution = fields.IntField()
     size = fields.FloatField()
+    hits = fields.IntField(default=0)
+    last_access = fields.BigIntField(default=0)
+    updated_at = fields.BigIntField(default=0)
 
     class Meta(tortoise.models.Model.Meta):
         table = "cache_qualitys"
-        unique_together = ("url", "resolution")
+        unique_together = ("video_id", "resolution")
 
 
 class Options(tortoise.models.Model):
@@ -57,5 +68,36 @@ class SendVideo(tortoise.models.Model):
         unique_together = ("user_id", "channel_url")
 
 
+class InfoJson(tortoise.models.Model):
+    id = fields.IntField(pk=True)
+    video_id = fields.CharField(max_length=255, unique=True)
+    data = fields.BinaryField()
+    size = fields.IntField()
+    expires_at = fields.BigIntField()
+    last_access = fields.BigIntField()
+
+    class Meta(tortoise.models.Model.Meta):
+        table = "info_json"
+
+
+class DownloadJob(tortoise.models.Model):
+    id = fields.IntField(pk=True)
+    video_id = fields.CharField(max_length=255)
+    quality = fields.IntField()
+    url = fields.CharField(max_length=255)
+    duration = fields.IntField()
+    priority = fields.IntField()
+    chat_id = fields.BigIntField()
+    message_id = fields.BigIntField()
+    workdir = fields.CharField(max_length=1024)
+    status = fields.CharField(max_length=20)
+    stages = fields.TextField(default="{}")
+    created_at = fields.BigIntField()
+    updated_at = fields.BigIntField()
+
+    class Meta(tortoise.models.Model.Meta):
+        table = "download_jobs"
+
+
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
@@ -1,5 +1,62 @@
+from typing import Dict
 from tortoise.exceptions import DoesNotExist
 from bot.db.models import Options
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+
+class OptionsCache:
+    # Holds every row of the options table; writes go to the DB first.
+    def __init__(self):
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._values: Dict[int, Dict[str, str]] = {}
+
+    def load(self, rows):
+        self._values = {}
+        for row in rows:
+            self._values.setdefault(row.user_id, {})[row.option_name] = row.value
+        self.loaded = True
+
+    def get(self, user_id: int, option_name: str) -> str:
+        value = self._values.get(user_id, {}).get(option_name)
+        if value is None:
+            # Unset options are answered from memory too, but count as misses.
+            self.misses += 1
+            return ''
+        self.hits += 1
+        return value
+
+    def set(self, user_id: int, option_name: str, value: str):
+        self._values.setdefault(user_id, {})[option_name] = value
+
+    def delete(self, user_id: int, option_name: str):
+        self._values.get(user_id, {}).pop(option_name, None)
+
+    def values(self, option_name: str) -> Dict[int, str]:
+        self.hits += 1
+        return {
+            user_id: options[option_name]
+            for user_id, options in self._values.items()
+            if option_name in options
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+options_cache = OptionsCache()
+
+
+async def load_options():
+    options_cache.load(await Options.all())
+    logging.debug(f"Options loaded: {options_cache.stats()}")
+
 
 async def set_option(user_id: int, option_name: str, value: str) -> bool:
     try:
@@ -8,12 +65,16 @@ async def set_option(user_id: int, option_name: str, value: str) -> bool:
             user_id=user_id,
             option_name=option_name
         )
+        options_cache.set(user_id, option_name, value)
         return True
     except Exception:
         return False
 
 
 async def get_option(user_id: int, option_name: str) -> str:
+    if options_cache.loaded:
+        return options_cache.get(user_id, option_name)
+    options_cache.misses += 1
     try:
         chat_option = await Options.get(user_id=user_id, option_name=option_name)
         return chat_option.value
@@ -27,6 +88,7 @@ async def del_option(user_id: int, option_name: str) -> bool:
     try:
         chat_option = await Options.get(user_id=user_id, option_name=option_name)
         await chat_option.delete()
+        options_cache.delete(user_id, option_name)
         return True
     except DoesNotExist:
         return False
@@ -35,6 +97,9 @@ async def del_option(user_id: int, option_name: str) -> bool:
 
 
 async def get_values(option_name: str) -> dict:
+    if options_cache.loaded:
+        return options_cache.values(option_name)
+    options_cache.misses += 1
     options = await Options.filter(option_name=option_name).all()
     return {opt.user_id: opt.value for opt in options}
 
@@ -1,26 +1,32 @@
 import asyncio
-from bot.core.helpers import safe_call, Common
+from itertools import cycle
+from bot.core.ticker import ticker
+from bot.core.helpers import safe_call
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
+SPINNER_FRAMES = ["⠋","⠙","⠹","⠸","⠼","⠴","⠦","⠧","⠇","⠏"]
+
+
 async def animate_message(message, base_text, started_event, refresh_rate=1.0):
-    spinner_frames = ["⠋","⠙","⠹","⠸","⠼","⠴","⠦","⠧","⠇","⠏"]
-    i = 0
+    frames = cycle(SPINNER_FRAMES)
+
+    async def edit(text):
+        await safe_call(message.edit_text, text=text)
+
+    animation = ticker.add(lambda: f"{next(frames)} {base_text}", edit, refresh_rate)
+    waiters = [
+        asyncio.create_task(started_event.wait()),
+        asyncio.create_task(animation.stopped.wait()),
+    ]
     try:
-        while not started_event.is_set():
-            frame = spinner_frames[i % len(spinner_frames)]
-            i += 1
-            try:
-                await safe_call(
-                    message.edit_text,
-                    text= f"{frame} {base_text}"
-                )
-            except Exception as e:
-                logging.warning(f"Spinner edit failed: {e}")
-                return
-            await asyncio.sleep(refresh_rate)
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
     except asyncio.CancelledError:
         pass
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+        ticker.remove(animation)
 
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
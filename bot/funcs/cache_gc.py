@@ -0,0 +1,39 @@
+import asyncio
+from bot.db.cache import evict_cache
+from bot.db.cache_qualitys import evict_qualitys
+from bot.db.info_json import prune_info_json
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+_task = None
+
+
+async def evict_caches():
+    cache_removed = await evict_cache(Config.cache_max_rows, Config.cache_max_age, Config.cache_policy)
+    quality_removed = await evict_qualitys(Config.quality_max_rows, Config.cache_max_age)
+    info_removed = await prune_info_json()
+    if cache_removed or quality_removed or info_removed:
+        logging.info(f"Evicted cache rows: cache={cache_removed}, cache_qualitys={quality_removed}, info_json={info_removed}")
+
+
+async def cache_gc_loop():
+    try:
+        while True:
+            try:
+                await evict_caches()
+            except Exception as e:
+                logging.error(f"Cache eviction failed: {e}")
+            await asyncio.sleep(Config.cache_gc_interval)
+    except asyncio.CancelledError:
+        pass
+
+
+def start_cache_gc():
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(cache_gc_loop())
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -1,10 +1,10 @@
 import re, pyrogram.types, asyncio
 from bot.funcs.animations import animate_message
 from bot.funcs.options import options_menu, option_set, quality_menu, refresh_menu
-from bot.funcs.media_msg import download_media_msg
+from bot.funcs.job_queue import enqueue_download
 from bot.funcs.watchdog import watchdog_switch
 from bot.youtube.get_info import get_video_metainfo, get_video_info
-from bot.db.cache import get_cache
+from bot.db.cache import get_cached_qualitys
 from bot.db.channels import get_channels, add_channel, del_channel
 from bot.core.helpers import safe_call, Common
 from bot.config import logging_config
@@ -12,7 +12,8 @@ logging = logging_config.setup_logging(__name__)
 
 
 async def start_command(_, message):
-    await message.reply_text(
+    await safe_call(
+        message.reply_text,
         "Welcome! To download a YouTube video directly to Telegram, simply send the video URL to this bot.\n\n"
         "- Use `/menu` to open a menu of additional functions and bot settings.\n"
         "- Use `/channel` to manage and add channels to the watch list.\n\n"
@@ -79,11 +80,10 @@ async def get_video_command(_, message):
             f"**URL Link**: {url_message}"
         )
 
+        cached = await get_cached_qualitys(url_message)
         buttons = []
         for quality, size in quality_dict.items():
-            cached_chat_id, cached_message_id = await get_cache(url_message, int(quality))
-            
-            if cached_chat_id and cached_message_id:
+            if int(quality) in cached:
                 color_emoji = "🟢"
             else:
                 color_emoji = "🔴"
@@ -121,7 +121,21 @@ async def get_video_command(_, message):
             "sem": sem
         }
 
-        await msg_info.delete()
+        await safe_call(msg_info.delete)
+
+
+def _entry_from_caption(message):
+    caption = message.caption or ''
+    url = re.search(r'URL Link: (\S+)', caption)
+    if not url:
+        return None
+    duration = 0
+    match = re.search(r'Duration: ([^\n]+)', caption)
+    if match:
+        units = {'hours': 3600, 'minutes': 60, 'seconds': 1}
+        for value, unit in re.findall(r'(\d+) (hours|minutes|seconds)', match.group(1)):
+            duration += int(value) * units[unit]
+    return {"url": url.group(1), "duration": duration}
 
 
 async def download_video_command(client, callback_query):
@@ -129,25 +143,41 @@ async def download_video_command(client, callback_query):
     message = callback_query.message
     message_id = message.id
     chat_id = message.chat.id
-    entry = Common.select_video[chat_id].get(message_id)
-    sem = entry.pop('sem')
+    entry = Common.select_video.setdefault(chat_id, {}).get(message_id)
+    if entry is None:
+        # The selection was lost with a restart: rebuild it from the posted caption.
+        entry = _entry_from_caption(message)
+        if entry is None:
+            await safe_call(callback_query.answer, 'This video is no longer available for download.')
+            return
+        sem = Common.user_semaphores[chat_id]
+        if sem.locked():
+            await safe_call(callback_query.answer, "You can't download more than 5 videos.")
+            return
+        await sem.acquire()
+        entry['sem'] = sem
+        Common.select_video[chat_id][message_id] = entry
+    sem = entry.pop('sem', None)
     if sem is None:
-        await callback_query.answer(
+        await safe_call(
+            callback_query.answer,
             'The download has already started.'
         )
         return
     match quality:
         case 0:
-            await callback_query.answer(
+            await safe_call(
+                callback_query.answer,
                 'This file exceeds 2GB and cannot be downloaded.',
                 show_alert=True
             )
             return
         case 1:
-            await callback_query.answer(
+            await safe_call(
+                callback_query.answer,
                 'Download canceled.'
             )
-            await message.delete()
+            await safe_call(message.delete)
             Common.select_video[chat_id].pop(message_id, None)
             sem.release()
             return
@@ -156,12 +186,13 @@ async def download_video_command(client, callback_query):
     duration = entry['duration']
 
     if quality == 2:
-        await callback_query.answer("You selected audio download!")
+        await safe_call(callback_query.answer, "You selected audio download!")
     else:
-        await callback_query.answer(f"You selected {quality}p quality!")
+        await safe_call(callback_query.answer, f"You selected {quality}p quality!")
 
     try:
-        await download_media_msg(client, message, message_id, url_message, quality, duration)
+        done = await enqueue_download(message, url_message, quality, duration)
+        await done
     finally:
         Common.select_video[chat_id].pop(message_id, None)
         sem.release()
@@ -0,0 +1,216 @@
+import asyncio
+from typing import Any, Dict, Optional
+from bot.db.models import DownloadJob
+from bot.db.jobs import (
+    enqueue_job, get_queued_jobs, claim_job, claim_next_job, finish_job,
+    requeue_running_jobs, get_active_workdirs, prune_jobs, DONE, FAILED
+)
+from bot.db.cache import get_cached_keys
+from bot.funcs.media_msg import download_media_msg, download_in_flight
+from bot.youtube.url import video_id
+from bot.core.scheduler import scheduler, INTERACTIVE, POSITION_INTERVAL
+from bot.core.ticker import ticker, Animation
+from bot.core.stages import StageTimer
+from bot.core.workdir import gc_workdirs, workdir_path
+from bot.core.helpers import safe_call
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+_tasks = set()
+_wakeup = asyncio.Event()
+_messages: Dict[int, Any] = {}
+_results: Dict[int, asyncio.Future] = {}
+_claimed: Dict[int, DownloadJob] = {}
+_positions: Dict[int, "QueuePosition"] = {}
+
+
+class QueuePosition:
+    # A job waiting in the database shows its place in the queue; the edits
+    # go through the shared ticker like the scheduler's waiters.
+    def __init__(self, message, media_name: str):
+        self.message = message
+        self.media_name = media_name
+        self.position = 0
+        self._animation: Optional[Animation] = ticker.add(self.render, self.edit, POSITION_INTERVAL)
+
+    def stop(self):
+        if self._animation is not None:
+            ticker.remove(self._animation)
+            self._animation = None
+
+    def render(self) -> Optional[str]:
+        if not self.position:
+            return None
+        return f"Your {self.media_name} download is queued, position: {self.position}"
+
+    async def edit(self, text: str):
+        await safe_call(self.message.edit_text, text=text)
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def enqueue_download(message, url, quality, duration, priority=INTERACTIVE) -> asyncio.Future:
+    vid = video_id(url)
+    job_id = await enqueue_job(
+        vid, int(quality), url, duration, priority,
+        message.chat.id, message.id, workdir_path(vid, int(quality))
+    )
+    _messages[job_id] = message
+    _positions[job_id] = QueuePosition(message, 'audio' if int(quality) == 2 else 'video')
+    future = asyncio.get_running_loop().create_future()
+    _results[job_id] = future
+    _wakeup.set()
+    logging.debug(f"{message.chat.id}: Enqueued job {job_id} for {vid} - Quality: {quality}")
+    return future
+
+
+async def _load_message(client, job):
+    try:
+        message = await safe_call(client.get_messages, job.chat_id, job.message_id)
+    except Exception as e:
+        logging.warning(f"{job.chat_id}: Can't load message for job {job.id}: {e}")
+        return None
+    if not message or message.empty:
+        return None
+    return message
+
+
+async def run_job(client, job):
+    timer = StageTimer()
+    uploaded = False
+    try:
+        message = _messages.pop(job.id, None) or await _load_message(client, job)
+        if message is not None:
+            uploaded = await download_media_msg(
+                client, message, job.message_id, job.url, job.quality,
+                job.duration, job.priority, timer
+            )
+    except asyncio.CancelledError:
+        # The job stays running in the database and is requeued on the next start.
+        future = _results.pop(job.id, None)
+        if future is not None:
+            future.cancel()
+        raise
+    except Exception as e:
+        logging.error(f"{job.chat_id}: Job {job.id} failed: {e}")
+
+    status = DONE if uploaded else FAILED
+    await finish_job(job.id, status, timer.stages)
+    logging.info(
+        f"{job.chat_id}: Job {job.id} {status} for {job.video_id} - Quality: {job.quality}, "
+        f"total {timer.total()}s, stages: {timer.stages}"
+    )
+    future = _results.pop(job.id, None)
+    if future is not None and not future.done():
+        future.set_result(uploaded)
+
+
+def _job_done(job_id: int):
+    _claimed.pop(job_id, None)
+    _wakeup.set()
+
+
+async def _wait_wakeup():
+    try:
+        await asyncio.wait_for(_wakeup.wait(), Config.job_poll_interval)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _start_job(client, job: DownloadJob, slot: bool):
+    position = _positions.pop(job.id, None)
+    if position is not None:
+        position.stop()
+    logging.debug(f"{job.chat_id}: Claimed job {job.id} for {job.video_id}, download slot: {slot}")
+    if slot:
+        _claimed[job.id] = job
+    task = _spawn(run_job(client, job))
+    task.add_done_callback(lambda _, job_id=job.id: _job_done(job_id))
+
+
+def _in_flight(job: DownloadJob) -> bool:
+    if download_in_flight(job.url, job.quality):
+        return True
+    return any((c.video_id, c.quality) == (job.video_id, job.quality) for c in _claimed.values())
+
+
+async def _claim_ready_jobs(client):
+    # Cache hits and duplicates of a running download never need a download
+    # slot, so they skip the queue instead of waiting behind long downloads.
+    queued = await get_queued_jobs()
+    if not queued:
+        return
+    cached = await get_cached_keys({job.video_id for job in queued})
+    for job in queued:
+        if (job.video_id, job.quality) in cached or _in_flight(job):
+            if await claim_job(job):
+                _start_job(client, job, slot=False)
+
+
+async def _claim_jobs(client):
+    # Downloads stay queued in the database until a slot is free, so a restart
+    # never strands a backlog of claimed jobs. A job that still finds no slot,
+    # such as a cached upload that turned out to be unusable, waits in the
+    # scheduler and holds off further claims until it gets one.
+    while True:
+        await _claim_ready_jobs(client)
+        if len(_claimed) >= scheduler.limit or scheduler.waiting():
+            return
+        job = await claim_next_job({c.chat_id for c in _claimed.values()})
+        if job is None:
+            return
+        _start_job(client, job, slot=True)
+
+
+async def _update_positions():
+    if not _positions:
+        return
+    for position, job in enumerate(await get_queued_jobs(), 1):
+        if job.id in _positions:
+            _positions[job.id].position = position
+
+
+async def job_worker(client):
+    try:
+        while True:
+            _wakeup.clear()
+            await _claim_jobs(client)
+            await _update_positions()
+            await _wait_wakeup()
+    except asyncio.CancelledError:
+        pass
+
+
+async def cleanup_workdirs(active):
+    removed = await asyncio.to_thread(gc_workdirs, active)
+    await prune_jobs(Config.work_max_age)
+    if removed:
+        logging.info(f"Removed {removed} stale work dirs")
+
+
+async def workdir_gc_loop():
+    try:
+        while True:
+            await asyncio.sleep(Config.work_gc_interval)
+            await cleanup_workdirs(await get_active_workdirs())
+    except asyncio.CancelledError:
+        pass
+
+
+async def start_job_queue(client):
+    requeued = await requeue_running_jobs()
+    if requeued:
+        logging.info(f"Requeued {requeued} interrupted downloads")
+    await cleanup_workdirs(await get_active_workdirs())
+    _spawn(job_worker(client))
+    _spawn(workdir_gc_loop())
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -1,33 +1,160 @@
-import asyncio
+import asyncio, os
+from pyrogram.errors import BadRequest
 from bot.youtube.downloader import download_media, download_thumbnail
 from bot.youtube.sponsorblock import sponsorblock
-from bot.db.cache import get_cache, set_cache
+from bot.youtube.thumbnail import get_thumbnail
+from bot.youtube.url import video_id
+from bot.db.cache import get_cache, set_cache, set_cache_media, del_cache
 from bot.db.cache_qualitys import set_quality_size
 from bot.funcs.animations import animate_message
+from bot.core.singleflight import SingleFlight
+from bot.core.scheduler import scheduler, INTERACTIVE
+from bot.core.workdir import job_workdir, remove_workdir
+from bot.core.stages import StageTimer
 from bot.core.helpers import safe_call, Common
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
-async def download_media_msg(client, message, message_id, url, quality, duration):
-    chat_id = message.chat.id
+_downloads = SingleFlight()
+
+
+def download_in_flight(url, quality) -> bool:
+    return _downloads.in_flight((video_id(url), int(quality)))
+
+
+async def send_cached(client, message, url, quality) -> bool:
+    entry = await get_cache(url, int(quality))
+    if entry is None:
+        return False
+    try:
+        if entry.file_id:
+            logging.debug(f"Cache find, send file: {entry.file_id}")
+            await safe_call(
+                client.send_cached_media,
+                chat_id=message.chat.id,
+                file_id=entry.file_id,
+                caption=entry.caption
+            )
+        else:
+            logging.debug(f"Cache find, forward message: {entry.chat_id, entry.message_id}")
+            forwarded = await safe_call(
+                client.forward_messages,
+                chat_id = message.chat.id,
+                from_chat_id = entry.chat_id,
+                message_ids = entry.message_id,
+                drop_author=True
+            )
+            # Legacy rows learn their file_id from the forwarded copy.
+            caption = forwarded.caption.markdown if forwarded.caption else ""
+            await set_cache_media(url, int(quality), forwarded, caption)
+    except BadRequest as e:
+        logging.warning(f"Cached media for {url} is no longer usable, drop it: {e}")
+        await del_cache(url, int(quality))
+        return False
+    await safe_call(message.delete)
+    return True
+
+
+async def download_media_msg(client, message, message_id, url, quality, duration, priority=INTERACTIVE, timer=None) -> bool:
     logging.debug(f"Found URL: {url} - Quality: {quality}")
     if quality == 2:
         media_name = 'audio'
     else:
         media_name = 'video'
 
-    cached_chat_id, cached_message_id = await get_cache(url, int(quality))
-    if cached_chat_id and cached_message_id:
-        logging.debug(f"Cache find, forward message: {cached_chat_id, cached_message_id}")
-        await safe_call(
-            client.forward_messages,
-            chat_id = chat_id,
-            from_chat_id = cached_chat_id,
-            message_ids = cached_message_id,
-            drop_author=True
+    timer = timer or StageTimer()
+    with timer.stage('cache_send'):
+        if await send_cached(client, message, url, quality):
+            return True
+
+    key = (video_id(url), int(quality))
+    while _downloads.in_flight(key):
+        logging.debug(f"Download already in flight, waiting for it: {key}")
+        wait_event = asyncio.Event()
+        spinner_task = asyncio.create_task(
+            animate_message(
+                message=message,
+                base_text=f"Waiting for the same {media_name} download...",
+                started_event=wait_event,
+                refresh_rate=1.0
+            )
         )
-        await message.delete()
-        return
+        try:
+            uploaded = await _downloads.wait(key)
+        except Exception:
+            uploaded = False
+        finally:
+            spinner_task.cancel()
+
+        if uploaded is None:
+            continue
+        if not uploaded or not await send_cached(client, message, url, quality):
+            await safe_call(
+                message.edit_text,
+                text=f"Error downloading the {media_name}."
+            )
+            return False
+        return True
+
+    uploaded, _ = await _downloads.do(key, scheduled_upload_media_msg, client, message, message_id, url, quality, duration, media_name, priority, timer)
+    return uploaded
+
+
+async def scheduled_upload_media_msg(client, message, message_id, url, quality, duration, media_name, priority, timer) -> bool:
+    async def on_position(position: int):
+        try:
+            await safe_call(
+                message.edit_text,
+                text=f"Your {media_name} download is queued, position: {position}"
+            )
+        except Exception as e:
+            logging.warning(f"Queue position edit failed: {e}")
+
+    with timer.stage('queue'):
+        await scheduler.acquire(message.chat.id, priority, on_position=on_position)
+    try:
+        return await upload_media_msg(client, message, message_id, url, quality, duration, media_name, timer)
+    finally:
+        scheduler.release()
+
+
+async def fetch_thumbnail(client, message, url):
+    try:
+        return await get_thumbnail(url)
+    except Exception as e:
+        logging.warning(f"Thumbnail fetch failed, use the posted photo: {e}")
+        return await download_thumbnail(client, message.photo.file_id)
+
+
+def _discard(*tasks):
+    for task in tasks:
+        task.cancel()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def upload_media_msg(client, message, message_id, url, quality, duration, media_name, timer) -> bool:
+    # Side fetches run alongside the download and are joined right before the upload.
+    sponsor_task = asyncio.create_task(sponsorblock(url))
+    thumbnail_task = asyncio.create_task(fetch_thumbnail(client, message, url))
+
+    workdir = job_workdir(video_id(url), int(quality))
+    logging.debug(f"Work dir {workdir} available")
+    try:
+        uploaded = await _upload_media_msg(
+            client, message, message_id, url, quality, duration, media_name,
+            workdir, sponsor_task, thumbnail_task, timer
+        )
+    finally:
+        _discard(sponsor_task, thumbnail_task)
+
+    # Partial files are kept on failure so a retried job resumes them.
+    if uploaded:
+        await asyncio.to_thread(remove_workdir, workdir)
+    return uploaded
+
+
+async def _upload_media_msg(client, message, message_id, url, quality, duration, media_name, workdir, sponsor_task, thumbnail_task, timer) -> bool:
+    chat_id = message.chat.id
 
     download_started_event = asyncio.Event()
     spinner_task = asyncio.create_task(
@@ -46,7 +173,9 @@ async def download_media_msg(client, message, message_id, url, quality, duration
             client,
             chat_id,
             message_id,
-            download_started_event
+            download_started_event,
+            workdir,
+            timer=timer
         )
     except Exception as e:
         logging.error(f"Downloading error: {e}")
@@ -59,7 +188,7 @@ async def download_media_msg(client, message, message_id, url, quality, duration
             message.edit_text,
             text=f"Error downloading the {media_name}."
         )
-        return
+        return False
 
     upload_started_event = asyncio.Event()
     upload_spinner_task = asyncio.create_task(
@@ -73,8 +202,8 @@ async def download_media_msg(client, message, message_id, url, quality, duration
 
     try:
         msg = f"URL: {url}\nQuality: {'audio' if quality == 2 else quality}\n"
-        msg = msg + await sponsorblock(url)
-        thumbnail = await download_thumbnail(client, message.photo.file_id)
+        msg = msg + await sponsor_task
+        thumbnail = await thumbnail_task
     except Exception as e:
         logging.error(f"Uploading error: {e}")
         msg = False
@@ -86,34 +215,36 @@ async def download_media_msg(client, message, message_id, url, quality, duration
             message.edit_text,
             text=f"Error Uploading the {media_name}."
         )
-        return
-
-    if quality == 2:
-        media_msg = await safe_call(
-            message.reply_audio,
-            media,
-            thumb=thumbnail,
-            caption=msg
-        )
-    else:
-        media_msg = await safe_call(
-            message.reply_video,
-            media,
-            thumb=thumbnail,
-            duration=duration,
-            caption=msg
-        )
+        return False
+
+    with timer.stage('upload'):
+        if quality == 2:
+            media_msg = await safe_call(
+                message.reply_audio,
+                media,
+                thumb=thumbnail,
+                caption=msg
+            )
+        else:
+            media_msg = await safe_call(
+                message.reply_video,
+                media,
+                thumb=thumbnail,
+                duration=duration,
+                caption=msg
+            )
 
     upload_spinner_task.cancel()
 
-    await set_cache(url, int(quality), media_msg.chat.id, media_msg.id)
+    with timer.stage('cache_write'):
+        await set_cache(url, int(quality), media_msg, msg)
 
-    size_in_bytes = len(media.getvalue())
-    size_in_mb = round(size_in_bytes / (1024 * 1024), 2)
-    await set_quality_size(url, int(quality), size_in_mb)
+        size_in_bytes = os.stat(media).st_size
+        size_in_mb = round(size_in_bytes / (1024 * 1024), 2)
+        await set_quality_size(url, int(quality), size_in_mb)
 
-    await message.delete()
+    await safe_call(message.delete)
+    return True
 
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
-
@@ -0,0 +1,32 @@
+import asyncio
+from bot.core.executors import pools_stats
+from bot.db.options import options_cache
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+_task = None
+
+
+def log_stats():
+    logging.info(f"Pools: {pools_stats()}")
+    logging.info(f"Options cache: {options_cache.stats()}")
+
+
+async def stats_loop():
+    try:
+        while True:
+            await asyncio.sleep(Config.stats_interval)
+            log_stats()
+    except asyncio.CancelledError:
+        pass
+
+
+def start_stats():
+    global _task
+    if Config.stats_interval > 0 and (_task is None or _task.done()):
+        _task = asyncio.create_task(stats_loop())
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
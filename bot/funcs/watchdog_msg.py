@@ -4,7 +4,8 @@ from bot.db.channels import get_channels
 from bot.db.last_video import get_last_sent_video, update_last_sent_video
 from bot.youtube.channel_scrap import channel_scrap
 from bot.youtube.get_info import get_video_metainfo, get_video_info
-from bot.funcs.media_msg import download_media_msg
+from bot.funcs.job_queue import enqueue_download
+from bot.core.scheduler import WATCHDOG
 from bot.core.helpers import safe_call, Common
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
@@ -68,7 +69,8 @@ async def watchdog_video_msg(client, user_id):
                             caption=msg_text
                         )
 
-                        await download_media_msg(client, msg, msg.id, new_video, selected, video_info['duration_sec'])
+                        # The job is durable once enqueued, so the video counts as sent right away.
+                        await enqueue_download(msg, new_video, selected, video_info['duration_sec'], WATCHDOG)
                         await update_last_sent_video(user_id, channel_url, new_video)
 
             await asyncio.sleep(refresh_in_seconds)
@@ -0,0 +1,69 @@
+import tempfile, time, os
+from typing import Any, Dict, List
+from bot.youtube.downloader import _download_media_sync, transfer_opts
+from bot.youtube.info_cache import extract_info
+from bot.youtube.formats import has_native_mp4
+from bot.core.executors import run_in_pool
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+
+def _no_progress(_: Dict[str, Any]):
+    pass
+
+
+def _settings() -> List[Dict[str, Any]]:
+    settings = []
+    for fragments in Config.benchmark_fragments:
+        for chunk_size in Config.benchmark_chunk_sizes:
+            settings.append({
+                "concurrent_fragments": int(fragments),
+                "http_chunk_size": int(chunk_size),
+            })
+    if Config.external_downloader:
+        settings.append({"external_downloader": Config.external_downloader})
+    return settings
+
+
+async def run_download_benchmark():
+    url = Config.benchmark_url
+    quality = Config.benchmark_quality
+    if not url:
+        logging.error("BENCHMARK_URL is not set")
+        return
+
+    info = await extract_info(url)
+    if not info:
+        logging.error(f"Failed to retrieve media information from the link: {url}")
+        return
+    native_mp4_available = has_native_mp4(info.get('formats', []))
+
+    results = []
+    for setting in _settings():
+        opts = transfer_opts(**{"external_downloader": "", **setting})
+        with tempfile.TemporaryDirectory() as workdir:
+            started = time.monotonic()
+            try:
+                await run_in_pool(
+                    "download", _download_media_sync,
+                    url, quality, info, workdir, native_mp4_available, _no_progress, opts
+                )
+            except Exception as e:
+                logging.error(f"Benchmark {setting} failed: {e}")
+                continue
+            elapsed = time.monotonic() - started
+            size = sum(
+                os.stat(os.path.join(workdir, name)).st_size
+                for name in os.listdir(workdir)
+            )
+        mib_per_sec = size / (1024 * 1024) / elapsed if elapsed > 0 else 0
+        results.append((mib_per_sec, setting, size, elapsed))
+        logging.info(f"Benchmark {setting}: {size / (1024 * 1024):.2f} MiB in {elapsed:.2f}s ({mib_per_sec:.2f} MiB/s)")
+
+    for mib_per_sec, setting, _, _ in sorted(results, key=lambda r: r[0], reverse=True):
+        logging.info(f"{mib_per_sec:8.2f} MiB/s  {setting}")
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
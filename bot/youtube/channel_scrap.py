@@ -1,12 +1,10 @@
-import asyncio
 from bot.core.helpers import Common
+from bot.core.executors import run_in_pool
 from bot.config.config import Config
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
 async def channel_scrap(channel_url: str) -> str:
-    loop = asyncio.get_event_loop()
-
     def _get_channel_info(_url: str):
         ydl_opts = {
             'extract_flat': True,
@@ -34,7 +32,7 @@ async def channel_scrap(channel_url: str) -> str:
         else:
             return ''
 
-    output = await loop.run_in_executor(None, _get_channel_info, channel_url)
+    output = await run_in_pool("extract", _get_channel_info, channel_url)
     return output
 
 if __name__ == "__main__":
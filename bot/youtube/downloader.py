@@ -1,101 +1,170 @@
-import tempfile, asyncio
+import tempfile, asyncio, copy, threading, shlex
+import multiprocessing
 from pathlib import Path
 from io import BytesIO
-from typing import Any, Dict
-from bot.youtube.hooks import create_progress_hook
-from bot.core.helpers import Common
+from typing import Any, Callable, Dict, Optional
+from yt_dlp.utils import DownloadError
+from bot.youtube.hooks import ProgressReporter
+from bot.youtube.info_cache import extract_info
+from bot.youtube.postprocess import postprocess_media_sync
+from bot.youtube.formats import AUDIO_FORMAT, has_native_mp4, video_format
+from bot.core.helpers import safe_call, Common
+from bot.core.executors import run_in_pool, pools
+from bot.core.stages import StageTimer
 from bot.config.config import Config
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
-async def download_media(url: str, quality: int, app, chat_id: int, message_id: int, download_started_event: asyncio.Event):
-    loop = asyncio.get_event_loop()
-
-    def _download_media_sync(_url: str, _quality: int):
-        progress_hook = create_progress_hook(app, chat_id, message_id, loop, download_started_event)
-
-        info_opts: Dict[str, Any] = {
-            'quiet': True,
-            'noplaylist': True,
-        }
-        if Config.http_proxy:
-            info_opts['proxy'] = Config.http_proxy
-            logging.debug("Use http proxy")
-        if Config.cookie_path:
-            info_opts['cookiefile'] = Config.cookie_path
-            logging.debug("Use cookie file")
-
-        with Common.youtube(info_opts) as ydl:
-            info = ydl.extract_info(_url, download=False)
-
-        native_mp4_available = False
-        if not info:
-            raise ValueError(f"Failed to retrieve media information from the link: {_url}")
-        for fmt in info.get('formats', []):
-            ext = fmt.get('ext')
-            if ext == 'mp4':
-                native_mp4_available = True
-                break
-
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            logging.debug(f"Temp dir {tmpdirname} available")
-            outtmpl = str(Path(tmpdirname) / '%(id)s.%(ext)s')
-
-            ydl_opts = {
-                'outtmpl': outtmpl,
-                'quiet': True,
-                'noplaylist': True,
-                'progress_hooks': [progress_hook],
-            }
-            if _quality == 2:
-                ydl_opts['format'] = "bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio"
-                ydl_opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192'
-                }]
-            else :
-                if native_mp4_available:
-                    logging.debug("Use mp4 for video")
-                    ydl_opts['format'] = f"bestvideo[ext=mp4][height={_quality}]+bestaudio[ext=m4a]/mp4"
-                    ydl_opts['postprocessors'] = [{
-                            'key': 'FFmpegVideoConvertor',
-                            'preferedformat': 'mp4',
-                        }]
-                else:
-                    ydl_opts['format'] = f"bestvideo[height={_quality}]+bestaudio/best"
-
-            if Config.http_proxy:
-                ydl_opts['proxy'] = Config.http_proxy
-                logging.debug("Use http proxy")
-            if Config.cookie_path:
-                ydl_opts['cookiefile'] = Config.cookie_path
-                logging.debug("Use cookie file")
-
-            with Common.youtube(ydl_opts) as ydl:
-                info = ydl.extract_info(_url, download=True)
-                filename = ydl.prepare_filename(info)
-                if (_quality != 2) and (not native_mp4_available):
-                    filename = str(Path(filename).with_suffix('.mp4'))
-                if _quality == 2:
-                    filename = str(Path(filename).with_suffix('.mp3'))
-
-            with open(filename, 'rb') as f:
-                media_bytes = BytesIO(f.read())
-
-            media_bytes.name = Path(filename).name
-            media_bytes.seek(0)
-
-        return media_bytes
-
-    return await loop.run_in_executor(None, _download_media_sync, url, quality)
+_PROGRESS_KEYS = (
+    'status',
+    'downloaded_bytes',
+    'total_bytes',
+    'total_bytes_estimate',
+    'elapsed',
+    'speed',
+)
+_manager = None
+
+
+class QueueProgress:
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __call__(self, d: Dict[str, Any]):
+        self.queue.put({k: d.get(k) for k in _PROGRESS_KEYS})
+
+
+def _progress_queue():
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.get_context('spawn').Manager()
+    return _manager.Queue()
+
+
+def _pump_progress(queue, hook: Callable[[Dict[str, Any]], None]):
+    while True:
+        d = queue.get()
+        if d is None:
+            return
+        hook(d)
+
+
+def transfer_opts(
+    concurrent_fragments: Optional[int] = None,
+    http_chunk_size: Optional[int] = None,
+    buffer_size: Optional[int] = None,
+    external_downloader: Optional[str] = None,
+    external_downloader_args: Optional[str] = None
+) -> Dict[str, Any]:
+    if concurrent_fragments is None:
+        concurrent_fragments = Config.concurrent_fragments
+    if http_chunk_size is None:
+        http_chunk_size = Config.http_chunk_size
+    if buffer_size is None:
+        buffer_size = Config.buffer_size
+    if external_downloader is None:
+        external_downloader = Config.external_downloader
+    if external_downloader_args is None:
+        external_downloader_args = Config.external_downloader_args
+
+    opts: Dict[str, Any] = {'concurrent_fragment_downloads': max(1, concurrent_fragments)}
+    if http_chunk_size > 0:
+        opts['http_chunk_size'] = http_chunk_size
+    if buffer_size > 0:
+        opts['buffersize'] = buffer_size
+    if external_downloader:
+        opts['external_downloader'] = {'default': external_downloader}
+        if external_downloader_args:
+            opts['external_downloader_args'] = {'default': shlex.split(external_downloader_args)}
+    return opts
+
+
+def _download_media_sync(
+    url: str,
+    quality: int,
+    info: Dict[str, Any],
+    workdir: str,
+    native_mp4_available: bool,
+    progress: Callable[[Dict[str, Any]], None],
+    transfer: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    outtmpl = str(Path(workdir) / '%(id)s.%(ext)s')
+
+    ydl_opts = {
+        'outtmpl': outtmpl,
+        'quiet': True,
+        'noplaylist': True,
+        'progress_hooks': [progress],
+        **(transfer if transfer is not None else transfer_opts()),
+    }
+    if quality == 2:
+        ydl_opts['format'] = AUDIO_FORMAT
+    else:
+        if native_mp4_available:
+            logging.debug("Use mp4 for video")
+        ydl_opts['format'] = video_format(quality, native_mp4_available)
+
+    if Config.http_proxy:
+        ydl_opts['proxy'] = Config.http_proxy
+        logging.debug("Use http proxy")
+    if Config.cookie_path:
+        ydl_opts['cookiefile'] = Config.cookie_path
+        logging.debug("Use cookie file")
+
+    with Common.youtube(ydl_opts) as ydl:
+        try:
+            result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+        except DownloadError as e:
+            logging.warning(f"Download from extracted info failed: {e}; retrying with URL {url}")
+            result = ydl.extract_info(url, download=True)
+
+    return Common.youtube.sanitize_info(result['requested_downloads'][-1])
+
+
+async def download_media(url: str, quality: int, app, chat_id: int, message_id: int, download_started_event: asyncio.Event, workdir: str, info: Optional[Dict[str, Any]] = None, timer: Optional[StageTimer] = None) -> str:
+    loop = asyncio.get_running_loop()
+    timer = timer or StageTimer()
+
+    if info is None:
+        with timer.stage('extract'):
+            info = await extract_info(url)
+    if not info:
+        raise ValueError(f"Failed to retrieve media information from the link: {url}")
+    native_mp4_available = has_native_mp4(info.get('formats', []))
+
+    reporter = ProgressReporter(app, chat_id, message_id, loop, download_started_event)
+    reporter.start()
+
+    with timer.stage('download'):
+        try:
+            if pools["download"].process:
+                queue = _progress_queue()
+                pump = threading.Thread(target=_pump_progress, args=(queue, reporter.hook), daemon=True)
+                pump.start()
+                try:
+                    download = await run_in_pool(
+                        "download", _download_media_sync,
+                        url, quality, info, workdir, native_mp4_available, QueueProgress(queue)
+                    )
+                finally:
+                    queue.put(None)
+            else:
+                download = await run_in_pool(
+                    "download", _download_media_sync,
+                    url, quality, info, workdir, native_mp4_available, reporter.hook
+                )
+        finally:
+            reporter.stop()
+
+    with timer.stage('postprocess'):
+        return await run_in_pool("postprocess", postprocess_media_sync, download, quality)
 
 
 async def download_thumbnail(client, file_id):
     with tempfile.TemporaryDirectory() as tmpdirname:
         logging.debug(f"Temp dir {tmpdirname} available")
         filename = str(Path(tmpdirname) / f'{file_id}.jpg')
-        await client.download_media(file_id, file_name=filename)
+        await safe_call(client.download_media, file_id, file_name=filename)
         with open(filename, 'rb') as f:
             img_bytes = BytesIO(f.read())
 
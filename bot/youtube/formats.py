@@ -0,0 +1,46 @@
+from typing import Any, Dict, List, Optional
+
+AUDIO_FORMAT = "bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio"
+
+
+def has_native_mp4(formats: List[Dict[str, Any]]) -> bool:
+    return any(f.get('ext') == 'mp4' for f in formats)
+
+
+def video_format(quality: int, native_mp4_available: bool, with_audio: bool = True) -> str:
+    if native_mp4_available:
+        if with_audio:
+            return f"bestvideo[ext=mp4][height={quality}]+bestaudio[ext=m4a]/mp4"
+        return f"bestvideo[ext=mp4][height={quality}]/mp4"
+    if with_audio:
+        return f"bestvideo[height={quality}]+bestaudio/best"
+    return f"bestvideo[height={quality}]"
+
+
+def progressive_format(quality: int) -> str:
+    return f"best[height={quality}]"
+
+
+def select_format(ydl, formats: List[Dict[str, Any]], fmt_selector: str) -> Optional[Dict[str, Any]]:
+    # Same context yt-dlp builds in process_video_result, so the selector
+    # resolves exactly as a simulate=True extraction would, minus the network.
+    selector = ydl.build_format_selector(fmt_selector)
+    ctx = {
+        'formats': formats,
+        'has_merged_format': any('none' not in (f.get('acodec'), f.get('vcodec')) for f in formats),
+        'incomplete_formats': (
+            all(f.get('vcodec') == 'none' for f in formats)
+            or all(f.get('acodec') == 'none' for f in formats)
+        ),
+    }
+    try:
+        selected = list(selector(ctx))
+    except Exception:
+        return None
+    if not selected:
+        return None
+    return selected[-1]
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
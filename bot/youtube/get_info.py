@@ -1,11 +1,17 @@
-import asyncio
 from typing import Any, Dict, Union, Mapping, Optional
 from bot.core.helpers import Common
+from bot.youtube.info_cache import extract_info
+from bot.youtube.url import video_id
+from bot.youtube.thumbnail import thumbnail_url
+from bot.core.singleflight import SingleFlight
+from bot.core.executors import run_in_pool
+from bot.youtube.formats import has_native_mp4, video_format, progressive_format, select_format
 from bot.db.cache_qualitys import set_qualitys, get_qualitys
-from bot.config.config import Config
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
+_metainfo_flights = SingleFlight()
+
 
 def _estimate_bytes_from_info(info: Optional[Mapping[str, Any]]) -> int:
     if not info:
@@ -37,134 +43,99 @@ def _estimate_bytes_from_format(fmt: dict, duration: Union[int, None]) -> int:
 
 
 async def get_video_metainfo(url: str) -> dict:
+    output, _ = await _metainfo_flights.do(video_id(url), _get_video_metainfo, url)
+    return output
+
+
+async def _get_video_metainfo(url: str) -> dict:
     output = await get_qualitys(url)
     if output:
         logging.debug("Use video metainfo from cache")
         return output
 
-    loop = asyncio.get_event_loop()
-
-    def _get_video_metainfo_sync(_url: str) -> dict:
-        base_opts: Dict[str, Any] = {
-            'quiet': True,
-            'noplaylist': True,
-        }
-        if Config.http_proxy:
-            base_opts['proxy'] = Config.http_proxy
-            logging.debug("Use http proxy")
-        if Config.cookie_path:
-            base_opts['cookiefile'] = Config.cookie_path
-            logging.debug("Use cookie file")
-
-        with Common.youtube(base_opts) as ydl:
-            try:
-                info = ydl.extract_info(_url, download=False)
-            except Exception as e:
-                logging.error(f'Extract video error: {e}')
-                return {}
-
-        if not info or "formats" not in info:
-            return {}
-
-        duration = info.get('duration') or 0
-
-        all_heights = sorted({
-            f['height']
-            for f in info['formats']
-            if f.get('height') and f.get('vcodec') not in (None, 'none')
-        })
-
-        audio_formats = [
-            f for f in info['formats']
-            if f.get('acodec') not in (None, 'none') and f.get('vcodec') in (None, 'none')
-        ]
-
-        def best_audio_for(container_pref: str) -> Union[dict, None]:
-            preferred = [f for f in audio_formats if f.get('ext') == container_pref]
-            pool = preferred if preferred else audio_formats
-            if not pool:
-                return None
-            return max(pool, key=lambda x: (x.get('abr') or x.get('tbr') or 0))
-
-        result: Dict[int, float] = {}
-
-        native_mp4_available = any(
-            f.get('ext') == 'mp4' for f in info.get('formats', [])
-        )
-
-        for quality in all_heights:
-            videos_video_only = [
-                f for f in info['formats']
-                if f.get('height') == quality
-                and f.get('vcodec') not in (None, 'none')
-                and f.get('acodec') in (None, 'none')
-            ]
-            progressive = [
-                f for f in info['formats']
-                if f.get('height') == quality
-                and f.get('vcodec') not in (None, 'none')
-                and f.get('acodec') not in (None, 'none')
-            ]
+    try:
+        info = await extract_info(url)
+    except Exception as e:
+        logging.error(f'Extract video error: {e}')
+        return {}
 
-            if videos_video_only:
-                best_video = max(videos_video_only, key=lambda x: (x.get('tbr') or x.get('vbr') or 0))
-                video_ext = best_video.get('ext') or ''
-                if video_ext == 'mp4':
-                    best_audio = best_audio_for('m4a') or best_audio_for('mp4')
-                elif video_ext == 'webm':
-                    best_audio = best_audio_for('webm')
-                else:
-                    best_audio = best_audio_for('m4a') or best_audio_for('webm')
+    if not info or "formats" not in info:
+        return {}
 
-                if best_audio:
-                    if native_mp4_available:
-                        fmt_selector = f"bestvideo[ext=mp4][height={quality}]+bestaudio[ext=m4a]/mp4"
-                    else:
-                        fmt_selector = f"bestvideo[height={quality}]+bestaudio/best"
-                else:
-                    if native_mp4_available:
-                        fmt_selector = f"bestvideo[ext=mp4][height={quality}]/mp4"
-                    else:
-                        fmt_selector = f"bestvideo[height={quality}]"
+    def _get_video_metainfo_sync(info: Dict[str, Any]) -> dict:
+        with Common.youtube({'quiet': True}) as ydl:
+            formats = info['formats']
 
-                sel_opts = dict(base_opts)
-                sel_opts['format'] = fmt_selector
-                sel_opts['simulate'] = True
+            duration = info.get('duration') or 0
 
-                with Common.youtube(sel_opts) as y2:
-                    try:
-                        selected = y2.extract_info(_url, download=False)
-                    except Exception:
-                        selected = {}
+            all_heights = sorted({
+                f['height']
+                for f in formats
+                if f.get('height') and f.get('vcodec') not in (None, 'none')
+            })
 
-                total_bytes = _estimate_bytes_from_info(selected)
-                if total_bytes <= 0:
-                    video_bytes = _estimate_bytes_from_format(best_video, duration)
-                    audio_bytes = _estimate_bytes_from_format(best_audio, duration) if best_audio else 0
-                    total_bytes = video_bytes + audio_bytes
-            elif progressive:
-                best_prog = max(progressive, key=lambda x: (x.get('tbr') or x.get('vbr') or 0))
-                fmt_selector = f"best[height={quality}]"
-                sel_opts = dict(base_opts)
-                sel_opts['format'] = fmt_selector
-                sel_opts['simulate'] = True
-
-                with Common.youtube(sel_opts) as y2:
-                    try:
-                        selected = y2.extract_info(_url, download=False)
-                    except Exception:
-                        selected = {}
-
-                total_bytes = _estimate_bytes_from_info(selected)
-                if total_bytes <= 0:
-                    total_bytes = _estimate_bytes_from_format(best_prog, duration)
-            else:
-                continue
+            audio_formats = [
+                f for f in formats
+                if f.get('acodec') not in (None, 'none') and f.get('vcodec') in (None, 'none')
+            ]
+
+            def best_audio_for(container_pref: str) -> Union[dict, None]:
+                preferred = [f for f in audio_formats if f.get('ext') == container_pref]
+                pool = preferred if preferred else audio_formats
+                if not pool:
+                    return None
+                return max(pool, key=lambda x: (x.get('abr') or x.get('tbr') or 0))
+
+            result: Dict[int, float] = {}
+
+            native_mp4_available = has_native_mp4(formats)
+
+            for quality in all_heights:
+                videos_video_only = [
+                    f for f in formats
+                    if f.get('height') == quality
+                    and f.get('vcodec') not in (None, 'none')
+                    and f.get('acodec') in (None, 'none')
+                ]
+                progressive = [
+                    f for f in formats
+                    if f.get('height') == quality
+                    and f.get('vcodec') not in (None, 'none')
+                    and f.get('acodec') not in (None, 'none')
+                ]
+
+                if videos_video_only:
+                    best_video = max(videos_video_only, key=lambda x: (x.get('tbr') or x.get('vbr') or 0))
+                    video_ext = best_video.get('ext') or ''
+                    if video_ext == 'mp4':
+                        best_audio = best_audio_for('m4a') or best_audio_for('mp4')
+                    elif video_ext == 'webm':
+                        best_audio = best_audio_for('webm')
+                    else:
+                        best_audio = best_audio_for('m4a') or best_audio_for('webm')
+
+                    fmt_selector = video_format(quality, native_mp4_available, with_audio=bool(best_audio))
+                    selected = select_format(ydl, formats, fmt_selector)
+
+                    total_bytes = _estimate_bytes_from_info(selected)
+                    if total_bytes <= 0:
+                        video_bytes = _estimate_bytes_from_format(best_video, duration)
+                        audio_bytes = _estimate_bytes_from_format(best_audio, duration) if best_audio else 0
+                        total_bytes = video_bytes + audio_bytes
+                elif progressive:
+                    best_prog = max(progressive, key=lambda x: (x.get('tbr') or x.get('vbr') or 0))
+                    selected = select_format(ydl, formats, progressive_format(quality))
+
+                    total_bytes = _estimate_bytes_from_info(selected)
+                    if total_bytes <= 0:
+                        total_bytes = _estimate_bytes_from_format(best_prog, duration)
+                else:
+                    continue
 
-            if total_bytes <= 0:
-                continue
+                if total_bytes <= 0:
+                    continue
 
-            result[quality] = round(total_bytes / (1024 * 1024), 2)
+                result[quality] = round(total_bytes / (1024 * 1024), 2)
 
         mp3_kbps = 192
         if duration and duration > 0:
@@ -179,71 +150,46 @@ async def get_video_metainfo(url: str) -> dict:
 
         return result
 
-    output = await loop.run_in_executor(None, _get_video_metainfo_sync, url)
+    output = await run_in_pool("extract", _get_video_metainfo_sync, info)
     await set_qualitys(url, output)
     return output
 
 
 async def get_video_info(url: str) -> Dict[str, Union[str, int, None]]:
-    loop = asyncio.get_event_loop()
-
-    def _get_video_info_sync(_url: str):
-        ydl_opts: Dict[str, Any] = {
-            'quiet': True,
-            'noplaylist': True,
-        }
-        if Config.http_proxy:
-            ydl_opts['proxy'] = Config.http_proxy
-            logging.debug("Use http proxy")
-        if Config.cookie_path:
-            ydl_opts['cookiefile'] = Config.cookie_path
-            logging.debug("Use cookie file")
-
-        with Common.youtube(ydl_opts) as ydl:
-            info = ydl.extract_info(_url, download=False)
-        if not info:
-            logging.error(f"Failed to retrieve channel information from the link: {_url}")
-            return {}
-        name = info.get('title', 'N/A')
-        duration = info.get('duration', 'N/A')
-        duration_sec = duration if duration != 'N/A' else 0
-        upload_date = info.get('upload_date', 'N/A')
-        author = info.get('uploader', 'N/A')
-
-        thumbnail = None
-        raw_thumb = info.get("thumbnail")
-        if raw_thumb:
-            fixed = raw_thumb.replace("/vi_webp/", "/vi/")
-            if fixed.lower().endswith(".webp"):
-                fixed = fixed[:-5] + ".jpg"
-            thumbnail = fixed
-
-        if duration != 'N/A':
-            if duration < 60:
-                duration_str = f"{duration} seconds"
-            elif duration < 3600:
-                minutes, seconds = divmod(duration, 60)
-                duration_str = f"{minutes} minutes {seconds} seconds"
-            else:
-                hours, remainder = divmod(duration, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                duration_str = f"{hours} hours {minutes} minutes {seconds} seconds"
+    info = await extract_info(url)
+    if not info:
+        logging.error(f"Failed to retrieve video information from the link: {url}")
+        return {}
+    name = info.get('title', 'N/A')
+    duration = info.get('duration', 'N/A')
+    duration_sec = duration if duration != 'N/A' else 0
+    upload_date = info.get('upload_date', 'N/A')
+    author = info.get('uploader', 'N/A')
+
+    thumbnail = thumbnail_url(info)
+
+    if duration != 'N/A':
+        if duration < 60:
+            duration_str = f"{duration} seconds"
+        elif duration < 3600:
+            minutes, seconds = divmod(duration, 60)
+            duration_str = f"{minutes} minutes {seconds} seconds"
         else:
-            duration_str = 'Unknown duration'
-        
-        video_info = {
-            "name": name,
-            "duration": duration_str,
-            "duration_sec": duration_sec,
-            "date": upload_date if upload_date != 'N/A' else 'Unknown date',
-            "author": author if author != 'N/A' else 'Unknown author',
-            "thumbnail": thumbnail,
-        }
-        return video_info
-
-    output = await loop.run_in_executor(None, _get_video_info_sync, url)
-
-    return output
+            hours, remainder = divmod(duration, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            duration_str = f"{hours} hours {minutes} minutes {seconds} seconds"
+    else:
+        duration_str = 'Unknown duration'
+    
+    video_info = {
+        "name": name,
+        "duration": duration_str,
+        "duration_sec": duration_sec,
+        "date": upload_date if upload_date != 'N/A' else 'Unknown date',
+        "author": author if author != 'N/A' else 'Unknown author',
+        "thumbnail": thumbnail,
+    }
+    return video_info
 
 
 if __name__ == "__main__":
@@ -1,72 +1,83 @@
-import asyncio, time
+import asyncio, threading
+from typing import Any, Dict, Optional
+from bot.core.ticker import ticker, Animation
+from bot.core.helpers import safe_call
 from bot.config import logging_config
 logging = logging_config.setup_logging(__name__)
 
-def create_progress_hook(app, chat_id, message_id, loop, download_started_event):
-    last_edit_time = 0
+FLUSH_INTERVAL = 2.0
 
-    async def _async_set_event(event):
-        event.set()
 
-    async def _do_edit_message_text(text: str):
-        try:
-            await app.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=text
-            )
-        except Exception as e:
-            logging.warning(f"Failed to edit progress message: {e}")
+def progress_text(d: Dict[str, Any]) -> str:
+    downloaded_bytes = d.get('downloaded_bytes') or 0
+    total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+    speed = d.get('speed') or 0
 
-    def hook(d):
-        nonlocal last_edit_time
-        if d['status'] == 'downloading':
-            if not download_started_event.is_set():
-                future = asyncio.run_coroutine_threadsafe(
-                    _async_set_event(download_started_event),
-                    loop
-                )
-                future.result()
+    if total_bytes > 0:
+        percent = downloaded_bytes / total_bytes * 100
+    else:
+        percent = 0
 
-            downloaded_bytes = d.get('downloaded_bytes') or 0
-            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
-            elapsed = d.get('elapsed') or 0
-            speed = d.get('speed') or 0
+    if speed > 0 and total_bytes > 0:
+        remaining_time = (total_bytes - downloaded_bytes) / speed
+    else:
+        remaining_time = 0
 
-            if total_bytes > 0:
-                percent = downloaded_bytes / total_bytes * 100
-            else:
-                percent = 0
+    return (
+        f"**Downloading:** {percent:2.1f}%\n"
+        f"**Downloaded:** {downloaded_bytes/1024/1024:2.2f}MB / {total_bytes/1024/1024:2.2f}MB\n"
+        f"**Speed:** {speed/1024:2.2f} KiB/s\n"
+        f"**ETA:** {int(remaining_time)}s"
+    )
 
-            if speed > 0 and total_bytes > 0:
-                remaining_time = (total_bytes - downloaded_bytes) / speed
-            else:
-                remaining_time = 0
 
-            now = time.time()
-            if now - last_edit_time < 2:
-                return
+class ProgressReporter:
+    # yt-dlp threads only record the latest state; the shared ticker renders it
+    # and edits the message, so downloads never wait on Telegram.
+    def __init__(self, app, chat_id: int, message_id: int, loop: asyncio.AbstractEventLoop, download_started_event: asyncio.Event, interval: float = FLUSH_INTERVAL):
+        self.app = app
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.loop = loop
+        self.download_started_event = download_started_event
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict[str, Any]] = None
+        self._started = False
+        self._animation: Optional[Animation] = None
 
-            last_edit_time = now
+    def hook(self, d: Dict[str, Any]):
+        if d['status'] != 'downloading':
+            return
+        with self._lock:
+            self._latest = d
+            started, self._started = self._started, True
+        if not started:
+            self.loop.call_soon_threadsafe(self.download_started_event.set)
 
-            progress_text = (
-                f"**Downloading:** {percent:2.1f}%\n"
-                f"**Downloaded:** {downloaded_bytes/1024/1024:2.2f}MB / {total_bytes/1024/1024:2.2f}MB\n"
-                f"**Speed:** {speed/1024:2.2f} KiB/s\n"
-                f"**ETA:** {int(remaining_time)}s"
-            )
+    def start(self):
+        self._animation = ticker.add(self.render, self.edit, self.interval)
 
-            future = asyncio.run_coroutine_threadsafe(
-                _do_edit_message_text(progress_text),
-                loop
-            )
+    def stop(self):
+        if self._animation is not None:
+            ticker.remove(self._animation)
+            self._animation = None
 
-            try:
-                future.result()
-            except Exception as e:
-                logging.warning(f"Failed to edit progress message: {e}")
+    def render(self) -> Optional[str]:
+        with self._lock:
+            d, self._latest = self._latest, None
+        if d is None:
+            return None
+        return progress_text(d)
+
+    async def edit(self, text: str):
+        await safe_call(
+            self.app.edit_message_text,
+            chat_id=self.chat_id,
+            message_id=self.message_id,
+            text=text
+        )
 
-    return hook
 
 if __name__ == "__main__":
     raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,131 @@
+import re, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from bot.core.helpers import Common
+from bot.core.singleflight import SingleFlight
+from bot.core.executors import run_in_pool
+from bot.youtube.url import video_id, canonical_url
+from bot.db.info_json import get_info_json, set_info_json
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+_EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+_EXPIRE_MARGIN = 300
+_TRIMMED_KEYS = (
+    'automatic_captions',
+    'subtitles',
+    'heatmap',
+    'thumbnails',
+    'description',
+)
+
+
+class InfoCache:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, info = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return info
+
+    def set(self, key: str, info: Dict[str, Any], expires_at: Optional[float] = None):
+        ttl_expiry = time.time() + self.ttl
+        self._entries[key] = (min(ttl_expiry, expires_at or ttl_expiry), info)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+
+info_cache = InfoCache(Config.info_cache_size, Config.info_cache_ttl)
+_extract_flights = SingleFlight()
+
+
+def trim_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in info.items() if k not in _TRIMMED_KEYS}
+
+
+def signed_url_expiry(info: Dict[str, Any]) -> int:
+    expiries = []
+    for fmt in info.get('formats', []):
+        for url in (fmt.get('url'), fmt.get('manifest_url')):
+            if not url:
+                continue
+            match = _EXPIRE_RE.search(url)
+            if match:
+                expiries.append(int(match.group(1)))
+    if not expiries:
+        return int(time.time()) + Config.info_cache_ttl
+    return min(expiries) - _EXPIRE_MARGIN
+
+
+def _extract_info_sync(url: str) -> Dict[str, Any]:
+    ydl_opts: Dict[str, Any] = {
+        'quiet': True,
+        'noplaylist': True,
+    }
+    if Config.http_proxy:
+        ydl_opts['proxy'] = Config.http_proxy
+        logging.debug("Use http proxy")
+    if Config.cookie_path:
+        ydl_opts['cookiefile'] = Config.cookie_path
+        logging.debug("Use cookie file")
+
+    with Common.youtube(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if not info:
+        return {}
+    return trim_info(Common.youtube.sanitize_info(info, remove_private_keys=True))
+
+
+async def extract_info(url: str) -> Dict[str, Any]:
+    # The returned dict is shared between callers and must be treated as read-only.
+    key = video_id(url)
+    info = info_cache.get(key)
+    if info is not None:
+        logging.debug(f"Info cache hit for {key}: {info_cache.stats()}")
+        return info
+
+    info, _ = await _extract_flights.do(key, _load_info, key, url)
+    return info
+
+
+async def _load_info(key: str, url: str) -> Dict[str, Any]:
+    info = await get_info_json(key)
+    if info:
+        logging.debug(f"Use info json for {key} from database")
+        info_cache.set(key, info, signed_url_expiry(info))
+        return info
+
+    info = await run_in_pool("extract", _extract_info_sync, canonical_url(url))
+    if info:
+        expires_at = signed_url_expiry(info)
+        info_cache.set(key, info, expires_at)
+        await set_info_json(key, info, expires_at)
+    logging.debug(f"Info cache miss for {key}: {info_cache.stats()}")
+    return info
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+from yt_dlp.postprocessor import FFmpegExtractAudioPP, FFmpegPostProcessor
+from yt_dlp.utils import PostProcessingError
+from bot.core.helpers import Common
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+MP4_VIDEO_CODECS = ('h264', 'hevc', 'av1')
+MP4_AUDIO_CODECS = ('aac', 'mp3', 'alac')
+
+
+def _streams(meta: Dict[str, Any], codec_type: str) -> List[Dict[str, Any]]:
+    return [s for s in meta.get('streams', []) if s.get('codec_type') == codec_type]
+
+
+def _is_container(meta: Dict[str, Any], name: str) -> bool:
+    return name in meta.get('format', {}).get('format_name', '').split(',')
+
+
+def _codec_opts(streams: List[Dict[str, Any]], compatible, transcode: List[str]) -> List[str]:
+    if all(s.get('codec_name') in compatible for s in streams):
+        return ['copy']
+    return transcode
+
+
+def _to_mp4(ffmpeg: FFmpegPostProcessor, filepath: str) -> str:
+    meta = ffmpeg.get_metadata_object(filepath)
+    video_opts = _codec_opts(_streams(meta, 'video'), MP4_VIDEO_CODECS, ['libx264', '-preset', 'veryfast', '-crf', '23'])
+    audio_opts = _codec_opts(_streams(meta, 'audio'), MP4_AUDIO_CODECS, ['aac', '-b:a', '192k'])
+
+    if _is_container(meta, 'mp4') and video_opts == audio_opts == ['copy']:
+        logging.debug(f"Keep {filepath}: already mp4 with compatible codecs")
+        return filepath
+
+    src = Path(filepath)
+    out = src.with_suffix('.mp4')
+    if out == src:
+        out = src.with_suffix('.temp.mp4')
+
+    if video_opts == audio_opts == ['copy']:
+        logging.debug(f"Remux {filepath} to mp4")
+    else:
+        logging.debug(f"Transcode {filepath} to mp4: video={video_opts[0]} audio={audio_opts[0]}")
+
+    ffmpeg.run_ffmpeg(str(src), str(out), [
+        '-map', '0:v?', '-map', '0:a?', '-dn', '-sn',
+        '-c:v', *video_opts,
+        '-c:a', *audio_opts,
+        '-movflags', '+faststart',
+    ])
+    if out.name.endswith('.temp.mp4'):
+        os.replace(out, src)
+        return str(src)
+    os.remove(src)
+    return str(out)
+
+
+def _verify(ffmpeg: FFmpegPostProcessor, filepath: str, container: str):
+    meta = ffmpeg.get_metadata_object(filepath)
+    if not _is_container(meta, container):
+        raise PostProcessingError(
+            f"Unexpected container for {filepath}: {meta.get('format', {}).get('format_name')}"
+        )
+
+
+def postprocess_media_sync(download: Dict[str, Any], quality: int) -> str:
+    with Common.youtube({'quiet': True}) as ydl:
+        ffmpeg = FFmpegPostProcessor(ydl)
+        if quality == 2:
+            download = ydl.run_pp(
+                FFmpegExtractAudioPP(ydl, preferredcodec='mp3', preferredquality='192'),
+                download
+            )
+            filepath = download['filepath']
+            _verify(ffmpeg, filepath, 'mp3')
+        else:
+            filepath = _to_mp4(ffmpeg, download['filepath'])
+            _verify(ffmpeg, filepath, 'mp4')
+    return filepath
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -1,4 +1,5 @@
 from bot.core.helpers import Common
+from bot.youtube.url import video_id
 
 def get_time_code(seconds):
     hours = int(seconds // 3600)
@@ -62,17 +63,8 @@ async def get_sponsor_segments(video_id):
     return sponsor_segments, selfpromo_segments, interaction_segments, intro_segments, outro_segments
 
 
-def get_url_id(url):
-    if "youtube.com" in url:
-        return url.split('v=')[-1]
-    elif "youtu.be" in url:
-        return url.split('/')[-1]
-    else:
-        return "unknown_id"
-
-
 async def sponsorblock(url):
-    url_id = get_url_id(url)
+    url_id = video_id(url)
     try:
         sponsor_segments, selfpromo_segments, interaction_segments, intro_segments, outro_segments = await get_sponsor_segments(url_id)
         formatted_str = format_segments(
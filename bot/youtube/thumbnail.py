@@ -0,0 +1,114 @@
+import asyncio
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Dict, Optional
+from bot.youtube.info_cache import extract_info
+from bot.youtube.url import video_id
+from bot.core.singleflight import SingleFlight
+from bot.core.helpers import Common
+from bot.config.config import Config
+from bot.config import logging_config
+logging = logging_config.setup_logging(__name__)
+
+THUMB_SIDE = 320
+THUMB_MAX_BYTES = 200 * 1024
+_JPEG_QUALITIES = (2, 5, 8, 12, 18, 24, 31)
+
+
+class ThumbnailCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def set(self, key: str, data: bytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+
+thumbnail_cache = ThumbnailCache(Config.thumb_cache_size * 1024 * 1024)
+_thumbnail_flights = SingleFlight()
+
+
+def thumbnail_url(info: Dict[str, Any]) -> Optional[str]:
+    raw_thumb = info.get("thumbnail")
+    if not raw_thumb:
+        return None
+    fixed = raw_thumb.replace("/vi_webp/", "/vi/")
+    if fixed.lower().endswith(".webp"):
+        fixed = fixed[:-5] + ".jpg"
+    return fixed
+
+
+async def _resize(data: bytes) -> bytes:
+    scale = (
+        f"scale='min({THUMB_SIDE},iw)':'min({THUMB_SIDE},ih)'"
+        ":force_original_aspect_ratio=decrease"
+    )
+    for quality in _JPEG_QUALITIES:
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-v', 'error', '-i', 'pipe:0',
+            '-vf', scale, '-frames:v', '1', '-q:v', str(quality),
+            '-f', 'image2', '-c:v', 'mjpeg', 'pipe:1',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        out, err = await proc.communicate(data)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to resize thumbnail: {err.decode(errors='ignore').strip()}")
+        if len(out) <= THUMB_MAX_BYTES:
+            return out
+    raise RuntimeError(f"Thumbnail does not fit in {THUMB_MAX_BYTES} bytes")
+
+
+async def _load_thumbnail(key: str, url: str) -> bytes:
+    info = await extract_info(url)
+    thumb = thumbnail_url(info) if info else None
+    if not thumb:
+        raise ValueError(f"No thumbnail for {url}")
+    response = await Common.http.get(thumb)
+    response.raise_for_status()
+    data = await _resize(response.content)
+    thumbnail_cache.set(key, data)
+    logging.debug(f"Thumbnail cached for {key}: {thumbnail_cache.stats()}")
+    return data
+
+
+async def get_thumbnail(url: str) -> BytesIO:
+    key = video_id(url)
+    data = thumbnail_cache.get(key)
+    if data is None:
+        data, _ = await _thumbnail_flights.do(key, _load_thumbnail, key, url)
+    thumbnail = BytesIO(data)
+    thumbnail.name = f"{key}.jpg"
+    return thumbnail
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
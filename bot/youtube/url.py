@@ -0,0 +1,47 @@
+import re
+from urllib.parse import urlparse, parse_qs
+
+_ID_RE = re.compile(r'^[\w-]{11}$')
+_PATH_PREFIXES = ('shorts', 'embed', 'live', 'v', 'e')
+_YOUTUBE_HOSTS = (
+    'youtube.com',
+    'www.youtube.com',
+    'm.youtube.com',
+    'music.youtube.com',
+    'youtube-nocookie.com',
+    'www.youtube-nocookie.com',
+)
+
+
+def video_id(url: str) -> str:
+    url = url.strip()
+    if _ID_RE.match(url):
+        return url
+
+    parsed = urlparse(url if '://' in url else f'https://{url}')
+    host = (parsed.hostname or '').lower()
+    parts = [p for p in parsed.path.split('/') if p]
+
+    candidate = ''
+    if host == 'youtu.be' and parts:
+        candidate = parts[0]
+    elif host in _YOUTUBE_HOSTS:
+        if parts[:1] == ['watch']:
+            candidate = parse_qs(parsed.query).get('v', [''])[0]
+        elif len(parts) >= 2 and parts[0] in _PATH_PREFIXES:
+            candidate = parts[1]
+
+    if _ID_RE.match(candidate):
+        return candidate
+    return url
+
+
+def canonical_url(url: str) -> str:
+    vid = video_id(url)
+    if not _ID_RE.match(vid):
+        return url
+    return f'https://www.youtube.com/watch?v={vid}'
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should be run only via main.py")
@@ -0,0 +1,6 @@
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'bot')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,95 @@
+import copy
+import pytest
+import yt_dlp
+from bot.youtube.formats import has_native_mp4, video_format, progressive_format, select_format
+
+
+def _format(format_id, ext, height, vcodec, acodec, tbr):
+    return {
+        'format_id': format_id,
+        'url': f'https://example.com/{format_id}',
+        'ext': ext,
+        'vcodec': vcodec,
+        'acodec': acodec,
+        'height': height,
+        'width': height * 16 // 9 if height else None,
+        'tbr': tbr,
+        'protocol': 'https',
+    }
+
+
+MP4_FORMATS = [
+    _format('140', 'm4a', None, 'none', 'mp4a.40.2', 129),
+    _format('251', 'webm', None, 'none', 'opus', 135),
+    _format('18', 'mp4', 360, 'avc1.42001E', 'mp4a.40.2', 500),
+    _format('134', 'mp4', 360, 'avc1.4d401e', 'none', 400),
+    _format('243', 'webm', 360, 'vp9', 'none', 350),
+    _format('136', 'mp4', 720, 'avc1.4d401f', 'none', 1500),
+    _format('247', 'webm', 720, 'vp9', 'none', 1200),
+    _format('137', 'mp4', 1080, 'avc1.640028', 'none', 3000),
+    _format('248', 'webm', 1080, 'vp9', 'none', 2500),
+]
+
+WEBM_FORMATS = [
+    _format('251', 'webm', None, 'none', 'opus', 135),
+    _format('243', 'webm', 360, 'vp9', 'none', 350),
+    _format('247', 'webm', 720, 'vp9', 'none', 1200),
+    _format('248', 'webm', 1080, 'vp9', 'none', 2500),
+]
+
+
+def _info(formats):
+    return {
+        'id': 'test',
+        'title': 'test',
+        'extractor': 'generic',
+        'extractor_key': 'Generic',
+        'webpage_url': 'https://example.com/test',
+        'formats': copy.deepcopy(formats),
+    }
+
+
+def _ydl(fmt=None):
+    params = {'quiet': True, 'no_warnings': True, 'simulate': True}
+    if fmt is not None:
+        params['format'] = fmt
+    return yt_dlp.YoutubeDL(params)
+
+
+def _sorted_formats(formats):
+    # get_info works on formats yt-dlp already sorted during extraction.
+    with _ydl() as ydl:
+        return ydl.process_ie_result(_info(formats), download=False)['formats']
+
+
+def _expected(formats, fmt):
+    with _ydl(fmt) as ydl:
+        return ydl.process_ie_result(_info(formats), download=False)['format_id']
+
+
+def _selected(formats, fmt):
+    with _ydl() as ydl:
+        selected = select_format(ydl, _sorted_formats(formats), fmt)
+    assert selected is not None
+    return selected['format_id']
+
+
+@pytest.mark.parametrize('formats, quality, format_id', [
+    (MP4_FORMATS, 720, '136+140'),
+    (MP4_FORMATS, 1080, '137+140'),
+    (WEBM_FORMATS, 720, '247+251'),
+    (MP4_FORMATS, 1440, '18'),
+])
+def test_video_format_matches_yt_dlp(formats, quality, format_id):
+    fmt = video_format(quality, has_native_mp4(formats))
+    assert _selected(formats, fmt) == _expected(formats, fmt) == format_id
+
+
+def test_progressive_format_matches_yt_dlp():
+    fmt = progressive_format(360)
+    assert _selected(MP4_FORMATS, fmt) == _expected(MP4_FORMATS, fmt) == '18'
+
+
+def test_has_native_mp4():
+    assert has_native_mp4(MP4_FORMATS)
+    assert not has_native_mp4(WEBM_FORMATS)
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from tortoise import Tortoise
+from bot.db import migrations
+from bot.db.db import db_config, db_pragmas
+from bot.db.migrations import MIGRATIONS, run_migrations
+
+# Cache tables as they were before the first migration.
+BASELINE_SCHEMA = """
+CREATE TABLE "cache" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "url" VARCHAR(255) NOT NULL,
+    "quality" BIGINT NOT NULL,
+    "chat_id" BIGINT NOT NULL,
+    "message_id" BIGINT NOT NULL,
+    CONSTRAINT "uid_cache_url_quality" UNIQUE ("url", "quality")
+);
+CREATE TABLE "cache_qualitys" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "url" VARCHAR(255) NOT NULL,
+    "resolution" INT NOT NULL,
+    "size" REAL NOT NULL,
+    CONSTRAINT "uid_cache_quali_url_resolution" UNIQUE ("url", "resolution")
+);
+INSERT INTO "cache" ("url", "quality", "chat_id", "message_id") VALUES
+    ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 720, 1, 10),
+    ('https://youtu.be/dQw4w9WgXcQ', 720, 1, 11),
+    ('https://youtu.be/dQw4w9WgXcQ', 1080, 1, 12);
+INSERT INTO "cache_qualitys" ("url", "resolution", "size") VALUES
+    ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 720, 10.0),
+    ('https://youtu.be/dQw4w9WgXcQ', 720, 11.0);
+"""
+
+
+async def _migrate(path):
+    await Tortoise.init(config=db_config(path, db_pragmas()))
+    try:
+        conn = Tortoise.get_connection("default")
+        await conn.execute_script(BASELINE_SCHEMA)
+        await Tortoise.generate_schemas()
+        await run_migrations()
+        _, version = await conn.execute_query("PRAGMA user_version")
+        _, cache = await conn.execute_query(
+            'SELECT "url", "quality", "message_id", "hits", "last_access" FROM "cache" ORDER BY "quality"'
+        )
+        _, qualitys = await conn.execute_query('SELECT "url", "resolution", "size" FROM "cache_qualitys"')
+        return version[0][0], [tuple(row) for row in cache], [tuple(row) for row in qualitys]
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_migrations_upgrade_baseline_schema(tmp_path):
+    version, cache, qualitys = asyncio.run(_migrate(str(tmp_path / "old.db")))
+
+    assert version == MIGRATIONS[-1][0]
+    assert [row[:4] for row in cache] == [
+        ('dQw4w9WgXcQ', 720, 11, 0),
+        ('dQw4w9WgXcQ', 1080, 12, 0),
+    ]
+    assert all(row[4] > 0 for row in cache)
+    assert qualitys == [('dQw4w9WgXcQ', 720, 11.0)]
+
+
+async def _broken_migration():
+    conn = Tortoise.get_connection("default")
+    await conn.execute_query(
+        'INSERT INTO "options" ("user_id", "option_name", "value") VALUES (?, ?, ?)',
+        [1, "broken", ""]
+    )
+    await migrations._add_column("cache", "broken", "INT NOT NULL DEFAULT 0")
+    await conn.execute_query(migrations._index_sql("idx_cache_broken", "cache", ("broken",)))
+    raise RuntimeError("migration failed")
+
+
+async def _migrate_broken(path):
+    await Tortoise.init(config=db_config(path, db_pragmas()))
+    try:
+        conn = Tortoise.get_connection("default")
+        await Tortoise.generate_schemas()
+        await run_migrations()
+        migrations.MIGRATIONS = [*MIGRATIONS, (MIGRATIONS[-1][0] + 1, "broken", _broken_migration)]
+        with pytest.raises(RuntimeError):
+            await run_migrations()
+        _, version = await conn.execute_query("PRAGMA user_version")
+        _, columns = await conn.execute_query('PRAGMA table_info("cache")')
+        _, indexes = await conn.execute_query('PRAGMA index_list("cache")')
+        _, rows = await conn.execute_query('SELECT COUNT(*) FROM "options"')
+        return (
+            version[0][0],
+            {row["name"] for row in columns},
+            {row["name"] for row in indexes},
+            rows[0][0],
+        )
+    finally:
+        migrations.MIGRATIONS = MIGRATIONS
+        await Tortoise.close_connections()
+
+
+def test_failed_migration_rolls_back(tmp_path):
+    version, columns, indexes, rows = asyncio.run(_migrate_broken(str(tmp_path / "broken.db")))
+
+    assert version == MIGRATIONS[-1][0]
+    assert "broken" not in columns
+    assert "idx_cache_broken" not in indexes
+    assert rows == 0
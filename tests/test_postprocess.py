@@ -0,0 +1,128 @@
+import hashlib, shutil, subprocess
+import pytest
+import yt_dlp
+from yt_dlp.postprocessor import FFmpegPostProcessor
+from bot.youtube.postprocess import _to_mp4, postprocess_media_sync
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which('ffmpeg') and shutil.which('ffprobe')),
+    reason="ffmpeg and ffprobe are required"
+)
+
+
+def _sample(path, video_codec, audio_codec):
+    subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25:duration=2',
+        '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2',
+        '-c:v', video_codec, '-c:a', audio_codec, '-shortest',
+        str(path),
+    ], check=True)
+    return str(path)
+
+
+def _stream_md5(path, stream):
+    result = subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', str(path),
+        '-map', f'0:{stream}', '-c', 'copy', '-f', 'md5', '-',
+    ], check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def _top_level_atoms(path):
+    atoms = []
+    with open(path, 'rb') as f:
+        while header := f.read(8):
+            size = int.from_bytes(header[:4], 'big')
+            atoms.append(header[4:].decode('latin-1'))
+            if size == 1:
+                size = int.from_bytes(f.read(8), 'big') - 8
+            f.seek(size - 8, 1)
+    return atoms
+
+
+def _file_md5(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+@pytest.fixture
+def ffmpeg():
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        yield FFmpegPostProcessor(ydl)
+
+
+def _codecs(ffmpeg, path):
+    meta = ffmpeg.get_metadata_object(path)
+    return (
+        meta['format']['format_name'].split(','),
+        {s['codec_type']: s['codec_name'] for s in meta['streams']},
+    )
+
+
+def test_remux_copies_streams(ffmpeg, tmp_path):
+    src = _sample(tmp_path / 'sample.mkv', 'libx264', 'aac')
+    video_md5, audio_md5 = _stream_md5(src, 'v'), _stream_md5(src, 'a')
+
+    out = _to_mp4(ffmpeg, src)
+
+    assert out == str(tmp_path / 'sample.mp4')
+    assert not (tmp_path / 'sample.mkv').exists()
+    containers, codecs = _codecs(ffmpeg, out)
+    assert 'mp4' in containers
+    assert codecs == {'video': 'h264', 'audio': 'aac'}
+    assert _stream_md5(out, 'v') == video_md5
+    assert _stream_md5(out, 'a') == audio_md5
+
+
+def test_partial_transcode_keeps_video(ffmpeg, tmp_path):
+    src = _sample(tmp_path / 'sample.mkv', 'libx264', 'libopus')
+    video_md5 = _stream_md5(src, 'v')
+
+    out = _to_mp4(ffmpeg, src)
+
+    _, codecs = _codecs(ffmpeg, out)
+    assert codecs == {'video': 'h264', 'audio': 'aac'}
+    assert _stream_md5(out, 'v') == video_md5
+
+
+def test_full_transcode(ffmpeg, tmp_path):
+    src = _sample(tmp_path / 'sample.webm', 'libvpx-vp9', 'libopus')
+
+    out = _to_mp4(ffmpeg, src)
+
+    _, codecs = _codecs(ffmpeg, out)
+    assert codecs == {'video': 'h264', 'audio': 'aac'}
+
+
+def test_compatible_mp4_is_kept(ffmpeg, tmp_path):
+    src = _sample(tmp_path / 'sample.mp4', 'libx264', 'aac')
+    md5 = _file_md5(src)
+
+    assert _to_mp4(ffmpeg, src) == src
+    assert _file_md5(src) == md5
+
+
+def test_incompatible_mp4_is_rewritten_in_place(ffmpeg, tmp_path):
+    src = _sample(tmp_path / 'sample.mp4', 'libx264', 'libopus')
+
+    out = _to_mp4(ffmpeg, src)
+
+    assert out == src
+    assert not (tmp_path / 'sample.temp.mp4').exists()
+    _, codecs = _codecs(ffmpeg, out)
+    assert codecs == {'video': 'h264', 'audio': 'aac'}
+
+
+@pytest.mark.parametrize('name, video_codec, audio_codec', [
+    ('sample.mkv', 'libx264', 'aac'),
+    ('sample.mkv', 'libx264', 'libopus'),
+    ('sample.webm', 'libvpx-vp9', 'libopus'),
+])
+def test_output_is_faststart(tmp_path, name, video_codec, audio_codec):
+    src = _sample(tmp_path / name, video_codec, audio_codec)
+
+    out = postprocess_media_sync({'filepath': src}, 720)
+
+    atoms = _top_level_atoms(out)
+    assert atoms.index('moov') < atoms.index('mdat')
@@ -0,0 +1,67 @@
+import asyncio, re
+import pytest
+from tortoise import Tortoise
+from bot.db.db import db_config, db_pragmas
+from bot.db.migrations import run_migrations
+from bot.db.models import Cache, CacheQuality, Channels, DownloadJob, InfoJson, Options, SendVideo
+from bot.db.jobs import QUEUED, RUNNING, DONE, FAILED
+
+HOT_QUERIES = {
+    "options by name": lambda: Options.filter(option_name="watchdog").values_list("user_id", "value"),
+    "cache lookup": lambda: Cache.filter(video_id="", quality=0).limit(1),
+    "cached qualities": lambda: Cache.filter(video_id="").values_list("quality", flat=True),
+    "cached keys": lambda: Cache.filter(video_id__in=["a", "b"]).values_list("video_id", "quality"),
+    "quality sizes": lambda: CacheQuality.filter(video_id="").order_by("resolution"),
+    "dropped qualities": lambda: CacheQuality.filter(video_id="").exclude(resolution__in=[360, 720]),
+    "user channels": lambda: Channels.filter(user_id=0),
+    "user channel": lambda: Channels.filter(user_id=0, url="").limit(1),
+    "last sent video": lambda: SendVideo.filter(user_id=0, channel_url="").limit(1),
+    "info lookup": lambda: InfoJson.filter(video_id="").limit(1),
+    "claim job": lambda: DownloadJob.filter(status=QUEUED).order_by("priority", "id").limit(1),
+    "claim job for idle chats": lambda: (
+        DownloadJob.filter(status=QUEUED).exclude(chat_id__in=[1, 2]).order_by("priority", "id").limit(1)
+    ),
+    "queued jobs": lambda: DownloadJob.filter(status=QUEUED).order_by("priority", "id"),
+    "requeue jobs": lambda: DownloadJob.filter(status=RUNNING),
+    "active workdirs": lambda: DownloadJob.filter(status__in=[QUEUED, RUNNING]).values_list("workdir", flat=True),
+    "prune jobs": lambda: DownloadJob.filter(status__in=[DONE, FAILED], updated_at__lt=0),
+    "expired info": lambda: InfoJson.filter(expires_at__lte=0),
+    "info by last access": lambda: InfoJson.all().order_by("-last_access").values_list("id", "size"),
+    "cache by last access": lambda: Cache.all().order_by("last_access").limit(1).values_list("id", flat=True),
+    "cache by hits": lambda: Cache.all().order_by("hits", "last_access").limit(1).values_list("id", flat=True),
+    "idle cache": lambda: Cache.filter(last_access__lt=0),
+    "qualitys by last access": lambda: (
+        CacheQuality.all().order_by("last_access").limit(1).values_list("id", flat=True)
+    ),
+    "idle qualitys": lambda: CacheQuality.filter(last_access__lt=0),
+}
+# Walking an index in order (SCAN ... USING INDEX) is how the eviction and
+# pruning queries read rows oldest first; only a bare table scan is a miss.
+FULL_SCAN = re.compile(r"^SCAN \S+$")
+
+
+async def _query_plans(path):
+    await Tortoise.init(config=db_config(path, db_pragmas()))
+    try:
+        await Tortoise.generate_schemas()
+        await run_migrations()
+        conn = Tortoise.get_connection("default")
+        plans = {}
+        for name, query in HOT_QUERIES.items():
+            _, rows = await conn.execute_query(f"EXPLAIN QUERY PLAN {query().sql(params_inline=True)}")
+            plans[name] = [row["detail"] for row in rows]
+        return plans
+    finally:
+        await Tortoise.close_connections()
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    return asyncio.run(_query_plans(str(tmp_path_factory.mktemp("db") / "plans.db")))
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(query_plans, name):
+    for detail in query_plans[name]:
+        assert not FULL_SCAN.match(detail), f"{name}: {query_plans[name]}"
+        assert "USE TEMP B-TREE" not in detail, f"{name}: {query_plans[name]}"